@@ -4,15 +4,29 @@
 """
 
 import argparse
+import array
+import functools
+import itertools
 import math
+import random
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from algorithms.ds.fenwick import Fenwick
+from algorithms.profiling import instrumentation
 from algorithms.search.binary_search import binary_search
 
 
-def parse_args():
+def parse_args(argv=None):
     """Parse command line arguments.
 
+    Args:
+      argv: list of str, arguments to parse, sys.argv[1:] if None.
+
     Returns:
       args from the argparse module
     """
@@ -24,7 +38,107 @@ def parse_args():
     parser.add_argument(
         '-k', default=3, type=int,
         help='Working with combinatorial objects of size k.')
-    return parser.parse_args()
+
+    io = argparse.ArgumentParser(add_help=False)
+    io.add_argument(
+        'kind', choices=KINDS,
+        help='Kind of the combinatorial objects.')
+    io.add_argument(
+        '--input', '-i', default='-',
+        help='File to read from, stdin if -.')
+    io.add_argument(
+        '--output', '-o', default='-',
+        help='File to write to, stdout if -.')
+    io.add_argument(
+        '--input-format', choices=('text', 'binary'), default='text',
+        help='Text has one record per line, objects as space separated '
+        'elements. Binary has fixed width little-endian records: encodings '
+        'of the fewest bytes that fit them, objects as k elements of 1, 2, '
+        '4 or 8 bytes.')
+    io.add_argument(
+        '--output-format', choices=('text', 'binary'), default='text',
+        help='Same as --input-format.')
+    io.add_argument(
+        '--block-size', default=1 << 16, type=int,
+        help='Number of records processed at once.')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser(
+        'encode', parents=[io],
+        help='Encode objects to integers.')
+    commands.add_parser(
+        'decode', parents=[io],
+        help='Decode integers to objects.')
+    args = parser.parse_args(argv)
+    if args.command is not None and args.block_size < 1:
+        parser.error('--block-size must be at least 1')
+    return args
+
+
+class BinomialCache(object):
+
+    def __init__(self):
+        """Initialize an empty cache.
+        """
+        # self._columns[j][m] is binom(m, j). Every column has its own
+        # length, only as long as the callers of that column needed.
+        self._columns = []
+
+    def columns(self, n, k):
+        """Get binom(m, j) for 0 <= m <= n and 0 <= j <= k, by column.
+
+        The cache grows in place: columns 0..k are extended to n+1 entries
+        and only missing columns are added, so entries are computed once per
+        process. Column j only needs column j-1 up to the same n, so a large
+        n for a small k does not make later columns that long. Columns
+        returned earlier stay valid.
+
+        Complexity O(k*n) new entries at most, O(k) if already cached.
+        Length of binomial coefficients is O(n).
+
+        Args:
+          n: int, non-negative.
+          k: int, non-negative.
+
+        Returns:
+          list of columns, column j <= k is a list with at least n+1
+          entries. Later columns can be shorter.
+        """
+        columns = self._columns
+        while len(columns) <= k:
+            columns.append([1] if not columns else [0])
+        for j in range(k + 1):
+            column = columns[j]
+            if len(column) > n:
+                continue
+            if j == 0:
+                column.extend([1] * (n + 1 - len(column)))
+                continue
+            previous = columns[j - 1]
+            for m in range(len(column), n + 1):
+                column.append(previous[m - 1] + column[m - 1])
+        return columns
+
+    def clear(self):
+        """Drop all cached entries.
+        """
+        self._columns = []
+
+
+# Binomial coefficients shared by all Combinatorist instances.
+_binomials = BinomialCache()
+
+# Kinds of combinatorial objects the command line works with.
+KINDS = ('combination', 'permutation', 'variation')
+
+# Factorial base conversions of fewer digits use the linear algorithms.
+_FACTORIAL_BASE_LEAF = 64
+
+# Lehmer codes of shorter permutations are computed with a fenwick tree.
+_BULK_LEHMER_MIN = 1 << 10
+
+# Largest k for which Combinatorist._floyd_many() checks membership against
+# all earlier columns, instead of one rng.choice() call per draw.
+_FLOYD_MANY_MAX_K = 64
 
 
 class Combinatorist(object):
@@ -32,31 +146,44 @@ class Combinatorist(object):
     def __init__(self, args):
         """Initialize with commandline arguments.
 
+        The binomial coefficients come from a cache shared by the process,
+        so only the first instance for a given n and k computes them. They
+        are fetched on first use, the *_without_table methods never need
+        them.
+
         Args:
           args: command-line arguments from argparse.
         """
         self.args = args
-        self.binom = self._binom()
+        self._columns = None
+        self._rows = None
+        self._uint64_table = None
 
-    def _binom(self):
-        """Compute binom(m, i) for 0 <= m <= n and 0 <= i <= k.
+    @property
+    def _binom_columns(self):
+        """Columns of binomial coefficients, _binom_columns[j][m] is
+        binom(m, j).
+        """
+        if self._columns is None:
+            self._columns = _binomials.columns(self.args.n, self.args.k)
+        return self._columns
 
-        Complexity O(k*n^2).
-        Length of binomial coefficients is O(n).
+    @property
+    def binom(self):
+        """binom(m, i) for 0 <= m <= n and 0 <= i <= k.
+
+        Built from the shared columns on first access and kept.
 
         Returns:
           (n+1)x(k+1) list with binom coefficients.
         """
-        binom = [
-            [0 for i in range(self.args.k + 1)] for i in range(self.args.n + 1)
-        ]
-        binom[0][0] = 1
-        for i in range(1, self.args.n + 1):
-            binom[i][0] = 1
-            for j in range(1, min(i, self.args.k) + 1):
-                binom[i][j] = binom[i - 1][j - 1] + binom[i - 1][j]
-        return binom
+        if self._rows is None:
+            columns = self._binom_columns[:self.args.k + 1]
+            self._rows = [[column[m] for column in columns]
+                          for m in range(self.args.n + 1)]
+        return self._rows
 
+    @instrumentation.instrumented('combinatorist.encode_combination')
     def encode_combination(self, combination):
         """Encode a combination in the combinatorial number system.
 
@@ -69,11 +196,13 @@ class Combinatorist(object):
           int, 0 <= ret < binom(n, k)
         """
         combination_set = sorted(set(combination))
+        columns = self._binom_columns
         ret = 0
         for i, e in enumerate(combination_set):
-            ret += self.binom[e][i + 1]
+            ret += columns[i + 1][e]
         return ret
 
+    @instrumentation.instrumented('combinatorist.decode_combination')
     def decode_combination(self, enc):
         """Decode an integer to its combination.
 
@@ -86,20 +215,150 @@ class Combinatorist(object):
           list, the decoded combination
         """
         ret = []
+        columns = self._binom_columns
         for k in range(self.args.k - 1, -1, -1):
+            column = columns[k + 1]
+
             # Predicate depends on enc and k.
             def pred(mid):
-                if enc < self.binom[mid][k + 1]:
+                if enc < column[mid]:
                     return True
                 else:
-                    return enc < self.binom[mid + 1][k + 1]
+                    return enc < column[mid + 1]
             lo = k
             hi = self.args.n - self.args.k + k
             e = binary_search(lo, hi, pred)
-            enc -= self.binom[e][k + 1]
+            enc -= column[e]
             ret.append(e)
         return list(reversed(ret))
 
+    def encode_combination_without_table(self, combination):
+        """Encode a combination without the table of binomial coefficients.
+
+        Same result as encode_combination().
+
+        Complexity O(k*n) big integer operations for math.comb().
+
+        Args:
+          combination: list/tuple, elements are in [0,n), size is k.
+        Returns:
+          int, 0 <= ret < binom(n, k)
+        """
+        combination_set = sorted(set(combination))
+        return sum(math.comb(e, i + 1) for i, e in enumerate(combination_set))
+
+    def decode_combination_without_table(self, enc):
+        """Decode an integer to its combination without the table of binomial
+        coefficients.
+
+        Walks the candidates m = n-1, n-2, ... down once. binom(m, i) for the
+        next candidate, or for the next position once an element is found,
+        follows from the current one by a multiplication and a division by
+        small integers. Memory is O(k), so n can be in the millions.
+
+        Same result as decode_combination().
+
+        Complexity O(n + k) steps, each on integers of length O(k*log(n)).
+
+        Args:
+          enc: int, non-negative, the encoding of a combination.
+        Returns:
+          list, the decoded combination
+        """
+        k = self.args.k
+        ret = []
+        if k == 0:
+            return ret
+        m = self.args.n - 1
+        binom = math.comb(m, k)
+        for i in range(k, 0, -1):
+            # Invariant: binom == binom(m, i).
+            while binom > enc:
+                binom = binom * (m - i) // m
+                m -= 1
+            ret.append(m)
+            enc -= binom
+            if i > 1:
+                # binom(m - 1, i - 1) = binom(m, i) * i / m.
+                binom = binom * i // m
+                m -= 1
+        return list(reversed(ret))
+
+    def _get_uint64_table(self):
+        """Get the binomial coefficients as a numpy uint64 array.
+
+        Entries that do not fit saturate at 2^64-1. Valid ranks never reach
+        them, and the columns stay sorted.
+
+        Raises:
+          ImportError, if numpy is not installed.
+          ValueError, if binom(n, k) does not fit in uint64.
+
+        Returns:
+          (k+1)x(n+1) numpy array, [j][m] is binom(m, j).
+        """
+        if self._uint64_table is None:
+            if numpy is None:
+                raise ImportError('Batched combinations need numpy')
+            n = self.args.n
+            k = self.args.k
+            if math.comb(n, k) > 2**64:
+                raise ValueError('binom(%d, %d) does not fit in uint64' %
+                                 (n, k))
+            top = 2**64 - 1
+            self._uint64_table = numpy.array(
+                [[min(b, top) for b in column[:n + 1]]
+                 for column in self._binom_columns[:k + 1]],
+                dtype=numpy.uint64)
+        return self._uint64_table
+
+    def encode_combinations(self, combinations):
+        """Encode many combinations at once with numpy.
+
+        Needs binom(n, k) <= 2^64. The elements of every combination must be
+        distinct, their order does not matter.
+
+        Complexity O(m*k*log(k)) for sorting the rows, the rest is a gather
+        and a sum in numpy.
+
+        Args:
+          combinations: m x k array-like of ints in [0, n).
+        Returns:
+          numpy uint64 array with m encodings.
+        """
+        table = self._get_uint64_table()
+        k = self.args.k
+        combinations = numpy.sort(
+            numpy.asarray(combinations, dtype=numpy.int64).reshape(-1, k),
+            axis=1)
+        terms = table[numpy.arange(1, k + 1), combinations]
+        return terms.sum(axis=1, dtype=numpy.uint64)
+
+    def decode_combinations(self, encs):
+        """Decode many integers to their combinations at once with numpy.
+
+        Needs binom(n, k) <= 2^64. Every position is found for all encodings
+        together with a sorted search of one table column.
+
+        Complexity O(m*k*log(n)) in numpy.
+
+        Args:
+          encs: array-like of m ints in [0, binom(n, k)).
+        Returns:
+          m x k numpy int64 array, the sorted combinations.
+        """
+        table = self._get_uint64_table()
+        k = self.args.k
+        encs = numpy.array(encs, dtype=numpy.uint64).reshape(-1)
+        ret = numpy.empty((len(encs), k), dtype=numpy.int64)
+        for i in range(k, 0, -1):
+            column = table[i]
+            # The largest e with binom(e, i) <= enc.
+            e = numpy.searchsorted(column, encs, side='right') - 1
+            ret[:, i - 1] = e
+            encs -= column[e]
+        return ret
+
     @staticmethod
     def factorial(n):
         """Compute n!.
@@ -118,14 +377,95 @@ class Combinatorist(object):
             fact *= i
         return fact
 
+    @staticmethod
+    def _rising_product(a, b):
+        """Compute a * (a+1) * ... * b by binary splitting.
+
+        Balanced products keep the operands of the big multiplications of
+        similar size, where fast multiplication pays off.
+
+        Args:
+          a: int, positive.
+          b: int, the product is 1 if b < a.
+
+        Return:
+          int, the product.
+        """
+        if b - a < 8:
+            ret = 1
+            for i in range(a, b + 1):
+                ret *= i
+            return ret
+        mid = (a + b) // 2
+        return (Combinatorist._rising_product(a, mid) *
+                Combinatorist._rising_product(mid + 1, b))
+
+    @staticmethod
+    def _from_factorial_base(digits, lo, hi):
+        """Value of factorial base digits lo..hi-1, relative to lo!.
+
+        Digit i has weight i!/lo!. Splits the digits in halves and combines
+        them as low + (mid!/lo!) * high, so the cost is dominated by a
+        logarithmic number of levels of balanced multiplications.
+
+        Args:
+          digits: list of int, digits[i] is in [0, i].
+          lo: int, first digit, inclusive.
+          hi: int, last digit, exclusive.
+
+        Return:
+          (int, int), the value and hi!/lo!.
+        """
+        if hi - lo <= _FACTORIAL_BASE_LEAF:
+            value = 0
+            weight = 1
+            for i in range(lo, hi):
+                if i > lo:
+                    weight *= i
+                value += digits[i] * weight
+            return value, weight * hi if hi > lo else 1
+        mid = (lo + hi) // 2
+        low, low_product = Combinatorist._from_factorial_base(digits, lo, mid)
+        high, high_product = Combinatorist._from_factorial_base(
+            digits, mid, hi)
+        return low + low_product * high, low_product * high_product
+
+    @staticmethod
+    def _to_factorial_base(value, lo, hi, digits):
+        """Split a value relative to lo! into factorial base digits lo..hi-1.
+
+        The inverse of _from_factorial_base(): one divmod by mid!/lo!
+        separates the low and the high half of the digits.
+
+        Args:
+          value: int, in [0, hi!/lo!).
+          lo: int, first digit, inclusive.
+          hi: int, last digit, exclusive.
+          digits: list of int, digits[lo:hi] are overwritten.
+
+        Return:
+          void
+        """
+        if hi - lo <= _FACTORIAL_BASE_LEAF:
+            for i in range(lo, hi):
+                value, digits[i] = divmod(value, i + 1)
+            return
+        mid = (lo + hi) // 2
+        high, low = divmod(value, Combinatorist._rising_product(lo + 1, mid))
+        Combinatorist._to_factorial_base(low, lo, mid, digits)
+        Combinatorist._to_factorial_base(high, mid, hi, digits)
+
     @staticmethod
     def lehmer_code_from_encoding(enc, k):
         """Convert a number encoding a permutation to the permutation's lehmer
         code.
 
-        Complexity O(k*log^2(k)*loglog^2(k) + k^2 log^2(k)).
-        The first term is from a fast factorial algorithm.
-        The second term is from the naive factorial algorithm.
+        The encoding is the lehmer code read as a number in the factorial
+        base, converted by divide and conquer in exact integer arithmetic.
+
+        Complexity O(M(k*log(k))*log^2(k)) plus the divisions, where M is
+        the cost of multiplication. Divisions are quadratic before python
+        3.12 and subquadratic after.
 
         Args:
           enc: int, encoding of a permutation. enc is in [0, k!).
@@ -134,16 +474,12 @@ class Combinatorist(object):
         Return:
           list, Lehmer code.
         """
-        lehmer = []
-        fact = math.factorial(k - 1)
-        for i in range(k - 1, 0, -1):
-            e = enc // fact
-            lehmer.append(e)
-            enc %= fact
-            fact /= i
-        # Add the final 0.
-        lehmer.append(0)
-        return lehmer
+        digits = [0] * k
+        Combinatorist._to_factorial_base(enc, 0, k, digits)
+        # The lehmer code starts with the most significant digit. The final
+        # digit, of weight 0!, is always 0.
+        digits.reverse()
+        return digits
 
     @staticmethod
     def lehmer_code_from_permutation(permutation):
@@ -152,6 +488,8 @@ class Combinatorist(object):
         Complexity O(k*log^2(k)).
         k is the length of the permutation.
         The extra log(k) is from the length of the integers.
+        Long permutations are handed to _bulk_lehmer_code() when numpy is
+        installed.
 
         Args:
           permutation: list/tuple, a permutation. Not empty.
@@ -159,6 +497,8 @@ class Combinatorist(object):
         Return:
           list, Lehmer code.
         """
+        if numpy is not None and len(permutation) >= _BULK_LEHMER_MIN:
+            return Combinatorist._bulk_lehmer_code(permutation).tolist()
         fenwick = Fenwick([0] * len(permutation), range_updates=False)
         lehmer = []
         for e in permutation:
@@ -166,13 +506,77 @@ class Combinatorist(object):
             fenwick.add(e, 1)
         return lehmer
 
+    @staticmethod
+    def _bulk_lehmer_code(permutation):
+        """Compute the lehmer code of a permutation with numpy.
+
+        A bottom-up merge sort. Before merging two sorted blocks, every
+        element of the left block counts the smaller elements of the right
+        block with one searchsorted over all blocks at once. Keys are
+        offset by the index of the merged block, which keeps the right
+        blocks of the whole level in one sorted array.
+
+        Complexity O(k*log^2(k)) in numpy, log(k) levels of a searchsorted.
+        The stable sort merging the blocks is linear on sorted runs.
+
+        Args:
+          permutation: list/tuple/numpy array, a permutation.
+
+        Return:
+          numpy int64 array, Lehmer code.
+        """
+        values = numpy.array(permutation, dtype=numpy.int64)
+        k = len(values)
+        lehmer = numpy.zeros(k, dtype=numpy.int64)
+        # Original positions of values, which are sorted in blocks of width.
+        order = numpy.arange(k)
+        slots = numpy.arange(k)
+        width = 1
+        while width < k:
+            pair = slots // (2 * width)
+            right = (slots // width) % 2 == 1
+            keys = pair * k + values
+            # Only the last block can be short, so the right block of pair p
+            # starts at p * width among the right keys.
+            left_pair = pair[~right]
+            smaller = (numpy.searchsorted(keys[right], keys[~right]) -
+                       left_pair * width)
+            lehmer[order[~right]] += smaller
+            merged = numpy.argsort(keys, kind='stable')
+            order = order[merged]
+            values = values[merged]
+            width *= 2
+        return lehmer
+
+    @staticmethod
+    def count_inversions(permutation):
+        """Count the pairs of elements of a permutation that are out of order.
+
+        The sum of the lehmer code.
+
+        Complexity O(lehmer_code_from_permutation()).
+
+        Args:
+          permutation: list/tuple, a permutation.
+
+        Return:
+          int, number of pairs i < j with permutation[i] > permutation[j].
+        """
+        if not permutation:
+            return 0
+        if numpy is not None and len(permutation) >= _BULK_LEHMER_MIN:
+            return int(Combinatorist._bulk_lehmer_code(permutation).sum())
+        return sum(Combinatorist.lehmer_code_from_permutation(permutation))
+
     @staticmethod
     def _get_prefix_sum_bsearch_predicate(fenwick, prefix_sum):
         """Return a predicate for binary searching prefix sums on a fenwick
         tree.
 
         A binary search using this predicate will find the leftmost index with
-        the given prefix sum.
+        the given prefix sum. The index is found up front with a single
+        descent of the tree, so every probe is O(1). The predicate reflects
+        the tree at the time of the call.
 
         Args:
           fenwick: algorithms.ds.fenwick.Fenwick, a fenwick tree.
@@ -181,22 +585,21 @@ class Combinatorist(object):
         Return:
           function, can be used as argument to binary search.
         """
+        lower_bound = fenwick.lower_bound(prefix_sum)
+
         def predicate(idx):
             """Lower bound predicate.
             """
-            return prefix_sum <= fenwick.sum(idx)
+            return lower_bound <= idx
         return predicate
 
     @staticmethod
+    @instrumentation.instrumented('combinatorist.decode_permutation')
     def decode_permutation(enc, k):
         """Decode an integer to a permutation.
 
-        Complexity O(k^2 log^2(k) + k * log^3(k)).
-        First term is lehmer_code_from_encoding().
-        Second term is complexity of loop:
-          First log factor is from binary search.
-          Accessing the underlying array (fenwick tree) takes log(k).
-          Last log factor is from the length of the integers.
+        Complexity O(lehmer_code_from_encoding() + k * log(k)).
+        Second term is selecting on the fenwick tree in the loop.
 
         Args:
           enc: int, encoding of a permuation. enc is in [0, k!).
@@ -207,23 +610,23 @@ class Combinatorist(object):
         """
         permutation = []
         lehmer = Combinatorist.lehmer_code_from_encoding(enc, k)
-        fenwick = Fenwick([0] + [1] * (k - 1), range_updates=False)
+        # Counts of the elements not used yet.
+        fenwick = Fenwick([1] * k, range_updates=False)
         for e in lehmer:
-            pred = Combinatorist._get_prefix_sum_bsearch_predicate(fenwick, e)
-            idx = binary_search(0, k, pred)
+            idx = fenwick.select(e)
             permutation.append(idx)
             fenwick.add(idx, -1)
         return permutation
 
     @staticmethod
+    @instrumentation.instrumented('combinatorist.encode_permutation')
     def encode_permutation(permutation):
         """Encode a permutation of [0,n) to a unique number in [0, n!).
 
-        Complexity O(n*log^2(n) + n^2*log^2(n) + n^2*log^2(n)).
+        Complexity O(n*log^2(n) + M(n*log(n))*log(n)).
         First term is lehmer_code_from_permutation().
-        Second term is naive factorial algorithm.
-        Third term is multiplication inside the loop: log(n) integer times
-          i*log(i) integer.
+        Second term is the divide and conquer factorial base conversion,
+          M is the cost of multiplication.
 
         Args:
           permutation: list/tuple, permutation of [0, len(permuation),
@@ -233,14 +636,12 @@ class Combinatorist(object):
           int, permutation encoding.
         """
         lehmer = Combinatorist.lehmer_code_from_permutation(permutation)
-        fact = 1
-        enc = 0
-        # lehmer[-1] is always 0.
-        for i in range(1, len(permutation)):
-            fact *= i
-            enc += lehmer[-i - 1] * fact
+        # Digit i of the factorial base, of weight i!, is lehmer[-i - 1].
+        lehmer.reverse()
+        enc, _ = Combinatorist._from_factorial_base(lehmer, 0, len(lehmer))
         return enc
 
+    @instrumentation.instrumented('combinatorist.encode_variation')
     def encode_variation(self, variation):
         """Encode a variation.
 
@@ -270,6 +671,7 @@ class Combinatorist(object):
         return (self.encode_combination(combination) * fact +
                 Combinatorist.encode_permutation(transformed_variation))
 
+    @instrumentation.instrumented('combinatorist.decode_variation')
     def decode_variation(self, enc):
         """Decode an integer to a variation (order matters!).
 
@@ -292,12 +694,897 @@ class Combinatorist(object):
         permutation = self.decode_permutation(enc % fact, self.args.k)
         return [combination[permutation[i]] for i in range(self.args.k)]
 
+    @staticmethod
+    def _next_combination(combination, n):
+        """Step a sorted combination to the one with the next encoding.
+
+        Encodings follow colexicographic order: bump the lowest element that
+        has room below its right neighbour and reset the ones before it.
+
+        Complexity O(1) amortized for k <= n/2.
+
+        Args:
+          combination: list, sorted combination of [0, n), changed in place.
+          n: int, size of the set.
+
+        Return:
+          bool, False if combination was the last one, then it is unchanged.
+        """
+        k = len(combination)
+        for i in range(k):
+            limit = combination[i + 1] if i + 1 < k else n
+            if combination[i] + 1 < limit:
+                combination[i] += 1
+                combination[:i] = range(i)
+                return True
+        return False
+
+    @staticmethod
+    def _next_permutation(permutation):
+        """Step a sequence to its next arrangement in lexicographic order.
+
+        Complexity O(1) amortized.
+
+        Args:
+          permutation: list of distinct elements, changed in place.
+
+        Return:
+          bool, False if permutation was the last one, then it is unchanged.
+        """
+        i = len(permutation) - 2
+        while i >= 0 and permutation[i] > permutation[i + 1]:
+            i -= 1
+        if i < 0:
+            return False
+        j = len(permutation) - 1
+        while permutation[j] < permutation[i]:
+            j -= 1
+        permutation[i], permutation[j] = permutation[j], permutation[i]
+        permutation[i + 1:] = reversed(permutation[i + 1:])
+        return True
+
+    def iter_combinations(self, a, b, reuse=False):
+        """Generate the combinations with encodings in [a, b), in order.
+
+        Decodes a once and steps to each next combination from there.
+
+        Complexity O(k*log(n)*n) for the first, O(1) amortized for each next.
+
+        Args:
+          a: int, first encoding, inclusive.
+          b: int, last encoding, exclusive. At most binom(n, k).
+          reuse: bool, yield the same list every time, updated in place,
+            instead of a new tuple.
+
+        Raises:
+          ValueError, unless 0 <= a <= b <= binom(n, k).
+
+        Return:
+          generator of combinations.
+        """
+        _check_range(a, b, math.comb(self.args.n, self.args.k))
+        if a == b:
+            return
+        combination = self.decode_combination(a)
+        for _ in range(b - a - 1):
+            yield combination if reuse else tuple(combination)
+            Combinatorist._next_combination(combination, self.args.n)
+        yield combination if reuse else tuple(combination)
+
+    @staticmethod
+    def iter_permutations(a, b, k, reuse=False):
+        """Generate the permutations with encodings in [a, b), in order.
+
+        Decodes a once and steps to each next permutation from there.
+
+        Complexity that of decode_permutation() for the first, O(1)
+        amortized for each next.
+
+        Args:
+          a: int, first encoding, inclusive.
+          b: int, last encoding, exclusive. At most k!.
+          k: int, permutations of [0, k). k >= 1.
+          reuse: bool, yield the same list every time, updated in place,
+            instead of a new tuple.
+
+        Raises:
+          ValueError, unless 0 <= a <= b <= k!.
+
+        Return:
+          generator of permutations.
+        """
+        _check_range(a, b, math.factorial(k))
+        if a == b:
+            return
+        permutation = Combinatorist.decode_permutation(a, k)
+        for _ in range(b - a - 1):
+            yield permutation if reuse else tuple(permutation)
+            Combinatorist._next_permutation(permutation)
+        yield permutation if reuse else tuple(permutation)
+
+    def iter_variations(self, a, b, reuse=False):
+        """Generate the variations with encodings in [a, b), in order.
+
+        The encodings list all k! arrangements of a combination before
+        moving on to the next combination. The combination is sorted, so
+        the next arrangement of the variation itself is the next one in
+        lexicographic order, and the first arrangement of the next
+        combination is that combination.
+
+        Complexity that of decode_variation() for the first, O(1) amortized
+        for each next.
+
+        Args:
+          a: int, first encoding, inclusive.
+          b: int, last encoding, exclusive. At most n!/(n-k)!.
+          reuse: bool, yield the same list every time, updated in place,
+            instead of a new tuple.
+
+        Raises:
+          ValueError, unless 0 <= a <= b <= n!/(n-k)!.
+
+        Return:
+          generator of variations.
+        """
+        _check_range(a, b, math.perm(self.args.n, self.args.k))
+        if a == b:
+            return
+        combination = self.decode_combination(a // math.factorial(self.args.k))
+        variation = self.decode_variation(a)
+        for _ in range(b - a - 1):
+            yield variation if reuse else tuple(variation)
+            if not Combinatorist._next_permutation(variation):
+                Combinatorist._next_combination(combination, self.args.n)
+                variation[:] = combination
+        yield variation if reuse else tuple(variation)
+
+    @instrumentation.instrumented('combinatorist.encode_revolving_door')
+    def encode_revolving_door(self, combination):
+        """Encode a combination by its position in revolving door order.
+
+        For the sorted combination c_1 < ... < c_k the encoding is
+            sum_i (-1)^(k-i) * (binom(c_i + 1, i) - 1).
+
+        Complexity O(k*n), like encode_combination().
+
+        Args:
+          combination: list/tuple, elements are in [0,n), size is k.
+        Returns:
+          int, 0 <= ret < binom(n, k)
+        """
+        combination_set = sorted(set(combination))
+        k = len(combination_set)
+        columns = self._binom_columns
+        ret = 0
+        for i, e in enumerate(combination_set, 1):
+            term = columns[i][e + 1] - 1
+            ret += -term if (k - i) % 2 else term
+        return ret
+
+    @instrumentation.instrumented('combinatorist.decode_revolving_door')
+    def decode_revolving_door(self, enc):
+        """Decode an integer to the combination at that position in revolving
+        door order.
 
-def main():
+        Complexity O(k*log(n)*n), like decode_combination().
+
+        Args:
+          enc: int, in [0, binom(n, k)).
+        Returns:
+          list, the decoded combination, sorted.
+        """
+        k = self.args.k
+        ret = [0] * k
+        hi = self.args.n
+        columns = self._binom_columns
+        for i in range(k, 0, -1):
+            column = columns[i]
+
+            # Predicate depends on enc and i.
+            def pred(mid):
+                return enc < column[mid]
+            # The largest e < hi with binom(e, i) <= enc.
+            e = binary_search(i, hi, pred) - 1
+            ret[i - 1] = e
+            enc = column[e + 1] - enc - 1
+            hi = e
+        return ret
+
+    @staticmethod
+    def _next_revolving_door(combination, n):
+        """Step a sorted combination to the next one in revolving door order.
+
+        Knuth's Algorithm R, TAOCP 7.2.1.3. The step depends only on the
+        combination, so it can start anywhere.
+
+        Complexity O(1) amortized.
+
+        Args:
+          combination: list, sorted combination of [0, n), changed in place.
+          n: int, size of the set.
+
+        Return:
+          (int, int), the element that left and the one that entered. None
+          if combination was the last one, then it is unchanged.
+        """
+        c = combination
+        k = len(c)
+        if k == 0 or k == n:
+            return None
+        # Easy cases move the smallest element.
+        if k % 2:
+            if c[0] + 1 < (c[1] if k > 1 else n):
+                c[0] += 1
+                return c[0] - 1, c[0]
+            increase = False
+        else:
+            if c[0] > 0:
+                c[0] -= 1
+                return c[0] + 1, c[0]
+            increase = True
+        j = 2
+        while j <= k:
+            if not increase:
+                # Try to decrease c[j - 1], which is c[j - 2] + 1.
+                if c[j - 1] >= j:
+                    out = c[j - 1]
+                    c[j - 1] = c[j - 2]
+                    c[j - 2] = j - 2
+                    return out, j - 2
+                j += 1
+                if j > k:
+                    break
+            # Try to increase c[j - 1], c[j - 2] is j - 2.
+            if c[j - 1] + 1 < (c[j] if j < k else n):
+                c[j - 2] = c[j - 1]
+                c[j - 1] += 1
+                return j - 2, c[j - 1]
+            j += 1
+            increase = False
+        return None
+
+    def iter_revolving_door(self, a, b, reuse=False):
+        """Generate the combinations with revolving door encodings in [a, b),
+        in order.
+
+        Consecutive combinations differ by one element that leaves and one
+        that enters, so a function of the combination can be updated from
+        the delta instead of computed again.
+
+        Complexity that of decode_revolving_door() for the first, O(1)
+        amortized for each next.
+
+        Args:
+          a: int, first encoding, inclusive.
+          b: int, last encoding, exclusive. At most binom(n, k).
+          reuse: bool, yield the same list every time, updated in place,
+            instead of a new tuple.
+
+        Raises:
+          ValueError, unless 0 <= a <= b <= binom(n, k).
+
+        Return:
+          generator of (combination, delta) pairs. delta is the (out, in)
+          pair of elements from the previous combination, None for the
+          first.
+        """
+        _check_range(a, b, math.comb(self.args.n, self.args.k))
+        if a == b:
+            return
+        combination = self.decode_revolving_door(a)
+        delta = None
+        for _ in range(b - a - 1):
+            yield (combination if reuse else tuple(combination)), delta
+            delta = Combinatorist._next_revolving_door(combination,
+                                                       self.args.n)
+        yield (combination if reuse else tuple(combination)), delta
+
+    @staticmethod
+    @instrumentation.instrumented('combinatorist.encode_plain_changes')
+    def encode_plain_changes(permutation):
+        """Encode a permutation by its position in plain changes order.
+
+        Plain changes (Steinhaus-Johnson-Trotter) order lists the
+        permutations of [0, j) by sweeping j - 1 across each permutation of
+        [0, j - 1), right to left after an even one and left to right after
+        an odd one. The position of j - 1 follows from the number of
+        smaller elements before it, counted on a fenwick tree.
+
+        Complexity O(k*log(k) + k^2*log(k)).
+        First term is the fenwick tree.
+        Second term is the multiplications of the growing encoding.
+
+        Args:
+          permutation: list/tuple, a permutation of [0, k). Not empty.
+
+        Return:
+          int, 0 <= ret < k!
+        """
+        k = len(permutation)
+        position = [0] * k
+        for i, e in enumerate(permutation):
+            position[e] = i
+        # Positions of the elements smaller than the current one.
+        fenwick = Fenwick([0] * k, range_updates=False)
+        fenwick.add(position[0], 1)
+        enc = 0
+        for e in range(1, k):
+            before = fenwick.sum(position[e])
+            enc = (e + 1) * enc + (before if enc % 2 else e - before)
+            fenwick.add(position[e], 1)
+        return enc
+
+    @staticmethod
+    def _plain_changes_digits(enc, k):
+        """Split a plain changes encoding in its sweeps.
+
+        Args:
+          enc: int, in [0, k!).
+          k: int, permutations of [0, k).
+
+        Return:
+          (list, list), for every j in [2, k]: the step of the sweep of
+          j - 1, and whether the encoding of the permutation of [0, j - 1)
+          it sweeps across is odd.
+        """
+        digits = [0] * (k + 1)
+        for j in range(k, 1, -1):
+            enc, digits[j] = divmod(enc, j)
+        odd = [False] * (k + 1)
+        parity = 0
+        for j in range(2, k + 1):
+            odd[j] = bool(parity)
+            parity = (j * parity + digits[j]) % 2
+        return digits, odd
+
+    @staticmethod
+    @instrumentation.instrumented('combinatorist.decode_plain_changes')
+    def decode_plain_changes(enc, k):
+        """Decode an integer to the permutation at that position in plain
+        changes order.
+
+        Complexity O(k^2*log^2(k)) for the divisions, the insertions are
+        O(k^2) element moves.
+
+        Args:
+          enc: int, in [0, k!).
+          k: int, decoded permutation will be a permutation of [0, k). k >= 1.
+
+        Return:
+          list, a permutation of range(k).
+        """
+        digits, odd = Combinatorist._plain_changes_digits(enc, k)
+        permutation = [0]
+        for j in range(2, k + 1):
+            if odd[j]:
+                permutation.insert(digits[j], j - 1)
+            else:
+                permutation.insert(j - 1 - digits[j], j - 1)
+        return permutation
+
+    @staticmethod
+    def iter_plain_changes(a, b, k, reuse=False):
+        """Generate the permutations with plain changes encodings in [a, b),
+        in order.
+
+        Consecutive permutations differ by a swap of adjacent elements.
+        Knuth's Algorithm P, TAOCP 7.2.1.2, makes each step. Its offsets and
+        directions are set up from the sweeps of a.
+
+        Complexity that of decode_plain_changes() for the first, O(1)
+        amortized for each next.
+
+        Args:
+          a: int, first encoding, inclusive.
+          b: int, last encoding, exclusive. At most k!.
+          k: int, permutations of [0, k). k >= 1.
+          reuse: bool, yield the same list every time, updated in place,
+            instead of a new tuple.
+
+        Raises:
+          ValueError, unless 0 <= a <= b <= k!.
+
+        Return:
+          generator of (permutation, swap) pairs. The elements at swap and
+          swap + 1 were exchanged, swap is None for the first permutation.
+        """
+        _check_range(a, b, math.factorial(k))
+        if a == b:
+            return
+        digits, odd = Combinatorist._plain_changes_digits(a, k)
+        permutation = Combinatorist.decode_plain_changes(a, k)
+        # Offset of j - 1 from the right end of its sweep, and its direction.
+        offset = [0] * (k + 1)
+        direction = [1] * (k + 1)
+        for j in range(2, k + 1):
+            if odd[j]:
+                offset[j] = j - 1 - digits[j]
+                direction[j] = -1
+            else:
+                offset[j] = digits[j]
+        swap = None
+        for _ in range(b - a - 1):
+            yield (permutation if reuse else tuple(permutation)), swap
+            j = k
+            # Number of finished sweeps that ended on the left.
+            s = 0
+            while True:
+                q = offset[j] + direction[j]
+                if 0 <= q < j:
+                    break
+                if q == j:
+                    s += 1
+                direction[j] = -direction[j]
+                j -= 1
+            swap = j - max(offset[j], q) + s - 1
+            permutation[swap], permutation[swap + 1] = (permutation[swap + 1],
+                                                        permutation[swap])
+            offset[j] = q
+        yield (permutation if reuse else tuple(permutation)), swap
+
+    def _encode_variation_without_table(self, variation):
+        """Encode a variation without the table of binomial coefficients.
+
+        Same result as encode_variation().
+
+        Args:
+          variation: list/tuple, a variation of size k of [0, n).
+
+        Return:
+          int, 0 <= ret < n!/(n-k)!
+        """
+        combination = sorted(variation)
+        d = {e: i for i, e in enumerate(combination)}
+        return (self.encode_combination_without_table(combination) *
+                math.factorial(len(variation)) +
+                Combinatorist.encode_permutation([d[e] for e in variation]))
+
+    @staticmethod
+    def _floyd(n, k, rng):
+        """Draw a uniform k-subset of [0, n) with Floyd's algorithm.
+
+        Step j draws t from [0, j]. If t is taken, j is taken instead, and j
+        cannot be taken yet. Every subset comes out with probability
+        1/binom(n, k).
+
+        Complexity O(k) expected, with set lookups.
+
+        Args:
+          n: int, size of the set.
+          k: int, size of the subset. 0 <= k <= n.
+          rng: random.Random or the random module.
+
+        Return:
+          set of int, the subset.
+        """
+        chosen = set()
+        for j in range(n - k, n):
+            t = rng.randrange(j + 1)
+            chosen.add(j if t in chosen else t)
+        return chosen
+
+    def _floyd_many(self, m, rng):
+        """Draw m uniform k-subsets with Floyd's algorithm in numpy.
+
+        All draws take step j at once. Membership is checked against the
+        earlier columns, so the complexity is O(m*k^2) in numpy. Above
+        _FLOYD_MANY_MAX_K that costs more than a call per draw, and every
+        draw is made by rng.choice() instead, O(m*k) in numpy.
+
+        Args:
+          m: int, number of draws.
+          rng: numpy.random.Generator.
+
+        Return:
+          m x k numpy int64 array, one subset per row, not sorted.
+        """
+        n = self.args.n
+        k = self.args.k
+        ret = numpy.empty((m, k), dtype=numpy.int64)
+        if k > _FLOYD_MANY_MAX_K:
+            for row in range(m):
+                ret[row] = rng.choice(n, size=k, replace=False, shuffle=False)
+            return ret
+        for col, j in enumerate(range(n - k, n)):
+            t = rng.integers(0, j + 1, size=m)
+            taken = (ret[:, :col] == t[:, None]).any(axis=1)
+            ret[:, col] = numpy.where(taken, j, t)
+        return ret
+
+    def sample_combination(self, rng=None, with_rank=False):
+        """Draw a uniform random combination.
+
+        No tables are needed: the draw is Floyd's algorithm, the rank comes
+        from encode_combination_without_table().
+
+        Complexity O(k) expected for the draw, O(k*log(k)) to sort it.
+
+        Args:
+          rng: random.Random, the random module if None.
+          with_rank: bool, also return the encoding of the combination.
+
+        Return:
+          list, the sorted combination, or (combination, encoding).
+        """
+        rng = random if rng is None else rng
+        combination = sorted(Combinatorist._floyd(self.args.n, self.args.k,
+                                                  rng))
+        if with_rank:
+            return combination, self.encode_combination_without_table(
+                combination)
+        return combination
+
+    @staticmethod
+    def sample_permutation(k, rng=None, with_rank=False):
+        """Draw a uniform random permutation with the Fisher-Yates shuffle.
+
+        Complexity O(k), plus encode_permutation() for the rank.
+
+        Args:
+          k: int, permutation of [0, k).
+          rng: random.Random, the random module if None.
+          with_rank: bool, also return the encoding of the permutation.
+
+        Return:
+          list, the permutation, or (permutation, encoding).
+        """
+        rng = random if rng is None else rng
+        permutation = list(range(k))
+        for i in range(k - 1, 0, -1):
+            j = rng.randrange(i + 1)
+            permutation[i], permutation[j] = permutation[j], permutation[i]
+        if with_rank:
+            return permutation, Combinatorist.encode_permutation(permutation)
+        return permutation
+
+    def sample_variation(self, rng=None, with_rank=False):
+        """Draw a uniform random variation.
+
+        The first k steps of a Fisher-Yates shuffle of [0, n). Only the
+        swapped positions are stored, in a dict, so n can be huge.
+
+        Complexity O(k) expected, plus the rank if requested.
+
+        Args:
+          rng: random.Random, the random module if None.
+          with_rank: bool, also return the encoding of the variation.
+
+        Return:
+          list, the variation, or (variation, encoding).
+        """
+        rng = random if rng is None else rng
+        n = self.args.n
+        # moved[i] is the element at position i of the shuffled [0, n).
+        moved = {}
+        variation = []
+        for i in range(self.args.k):
+            j = rng.randrange(i, n)
+            variation.append(moved.get(j, j))
+            moved[j] = moved.get(i, i)
+        if with_rank:
+            return variation, self._encode_variation_without_table(variation)
+        return variation
+
+    @staticmethod
+    def _is_generator(rng):
+        """Whether rng is a numpy random generator.
+        """
+        return numpy is not None and isinstance(rng, numpy.random.Generator)
+
+    @staticmethod
+    def _unzip(draws, with_rank):
+        """Split a list of (object, encoding) draws in two lists.
+        """
+        if not with_rank:
+            return draws
+        objects, ranks = zip(*draws) if draws else ((), ())
+        return list(objects), list(ranks)
+
+    def sample_combinations(self, m, rng=None, with_rank=False):
+        """Draw m uniform random combinations.
+
+        With a numpy generator the draws run in numpy, see _floyd_many(). The
+        ranks use encode_combination_without_table() either way, so no table
+        is built for them.
+
+        Args:
+          m: int, number of draws.
+          rng: random.Random or numpy.random.Generator, the random module if
+            None.
+          with_rank: bool, also return the encodings.
+
+        Return:
+          list of sorted combinations, an m x k numpy int64 array with a
+          numpy generator. With with_rank a pair of that and a list of the
+          encodings.
+        """
+        if not Combinatorist._is_generator(rng):
+            return Combinatorist._unzip(
+                [self.sample_combination(rng, with_rank) for _ in range(m)],
+                with_rank)
+        combinations = self._floyd_many(m, rng)
+        combinations.sort(axis=1)
+        if not with_rank:
+            return combinations
+        return combinations, [self.encode_combination_without_table(c)
+                              for c in combinations.tolist()]
+
+    @staticmethod
+    def sample_permutations(m, k, rng=None, with_rank=False):
+        """Draw m uniform random permutations of [0, k).
+
+        With a numpy generator every row of an m x k array is shuffled in
+        numpy.
+
+        Args:
+          m: int, number of draws.
+          k: int, permutations of [0, k).
+          rng: random.Random or numpy.random.Generator, the random module if
+            None.
+          with_rank: bool, also return the encodings.
+
+        Return:
+          list of permutations, an m x k numpy int64 array with a numpy
+          generator. With with_rank a pair of that and a list of the
+          encodings.
+        """
+        if not Combinatorist._is_generator(rng):
+            return Combinatorist._unzip(
+                [Combinatorist.sample_permutation(k, rng, with_rank)
+                 for _ in range(m)],
+                with_rank)
+        permutations = rng.permuted(
+            numpy.tile(numpy.arange(k, dtype=numpy.int64), (m, 1)), axis=1)
+        if not with_rank:
+            return permutations
+        return permutations, [Combinatorist.encode_permutation(p)
+                              for p in permutations.tolist()]
+
+    def sample_variations(self, m, rng=None, with_rank=False):
+        """Draw m uniform random variations.
+
+        With a numpy generator the subsets come from _floyd_many() and every
+        row is then shuffled, which makes the order uniform too.
+
+        Args:
+          m: int, number of draws.
+          rng: random.Random or numpy.random.Generator, the random module if
+            None.
+          with_rank: bool, also return the encodings.
+
+        Return:
+          list of variations, an m x k numpy int64 array with a numpy
+          generator. With with_rank a pair of that and a list of the
+          encodings.
+        """
+        if not Combinatorist._is_generator(rng):
+            return Combinatorist._unzip(
+                [self.sample_variation(rng, with_rank) for _ in range(m)],
+                with_rank)
+        variations = rng.permuted(self._floyd_many(m, rng), axis=1)
+        if not with_rank:
+            return variations
+        return variations, [self._encode_variation_without_table(v)
+                            for v in variations.tolist()]
+
+
+def space_size(kind, n, k):
+    """Number of encodings of a kind of objects.
+
+    Args:
+      kind: str, one of KINDS.
+      n: int, size of the set. Unused for permutations.
+      k: int, size of the objects.
+
+    Raises:
+      ValueError, for an unknown kind.
+
+    Return:
+      int, binom(n, k), k! or n!/(n-k)!.
+    """
+    if kind == 'combination':
+        return math.comb(n, k)
+    if kind == 'permutation':
+        return math.factorial(k)
+    if kind == 'variation':
+        return math.perm(n, k)
+    raise ValueError('Unknown kind %r' % (kind,))
+
+
+def _check_range(a, b, size):
+    """Check a range of encodings.
+
+    Args:
+      a: int, first encoding, inclusive.
+      b: int, last encoding, exclusive.
+      size: int, number of encodings.
+
+    Raises:
+      ValueError, unless 0 <= a <= b <= size.
+
+    Return:
+      void
+    """
+    if not 0 <= a <= b <= size:
+        raise ValueError('Encodings [%d, %d) out of range [0, %d)' %
+                         (a, b, size))
+
+
+def _element_typecode(largest):
+    """Smallest unsigned array typecode that holds the elements.
+
+    Args:
+      largest: int, the largest element.
+
+    Return:
+      str, array typecode of 1, 2, 4 or 8 bytes.
+    """
+    for typecode in 'BHIQ':
+        if largest < 1 << 8 * array.array(typecode).itemsize:
+            return typecode
+    raise ValueError('Elements up to %d do not fit in 8 bytes' % largest)
+
+
+def _read_records(stream, binary, record_size, block_size):
+    """Read blocks of records.
+
+    Args:
+      stream: binary file.
+      binary: bool, fixed width records instead of lines.
+      record_size: int, bytes per binary record.
+      block_size: int, records per block.
+
+    Raises:
+      ValueError, if the last binary record is truncated.
+
+    Return:
+      generator of blocks, bytes for binary records, lists of non-empty
+      lines otherwise.
+    """
+    if binary:
+        while True:
+            data = stream.read(record_size * block_size)
+            if not data:
+                return
+            if len(data) % record_size:
+                raise ValueError('Truncated record at the end of the input')
+            yield data
+    else:
+        while True:
+            lines = list(itertools.islice(stream, block_size))
+            if not lines:
+                return
+            yield [line for line in lines if not line.isspace()]
+
+
+def _convert(combinatorist, args, infile, outfile):
+    """Encode or decode records from infile to outfile.
+
+    Every block of records is parsed, converted and written at once. The
+    combinatorist, and its table of binomials, serves the whole stream.
+    Combinations are converted with the batched numpy methods when their
+    encodings fit in uint64.
+
+    Args:
+      combinatorist: Combinatorist, of n and k.
+      args: command-line arguments from parse_args().
+      infile: binary file to read from.
+      outfile: binary file to write to.
+
+    Raises:
+      ValueError, for malformed records or encodings out of range.
+
+    Return:
+      int, the number of records converted.
+    """
+    n = args.n
+    k = args.k
+    kind = args.kind
+    encode = args.command == 'encode'
+    size = space_size(kind, n, k)
+    rank_width = max(1, ((size - 1).bit_length() + 7) // 8)
+    # Elements of the objects are in [0, universe).
+    universe = k if kind == 'permutation' else n
+    typecode = _element_typecode(max(universe, 1) - 1)
+    element_width = array.array(typecode).itemsize
+    swap = sys.byteorder != 'little'
+    batched = (kind == 'combination' and numpy is not None and k > 0 and
+               size <= 2**64)
+
+    if kind == 'combination':
+        encoder = combinatorist.encode_combination
+        decoder = combinatorist.decode_combination
+    elif kind == 'permutation':
+        encoder = Combinatorist.encode_permutation
+        decoder = functools.partial(Combinatorist.decode_permutation, k=k)
+    else:
+        encoder = combinatorist.encode_variation
+        decoder = combinatorist.decode_variation
+
+    binary_in = args.input_format == 'binary'
+    binary_out = args.output_format == 'binary'
+    record_size = k * element_width if encode else rank_width
+    count = 0
+    for block in _read_records(infile, binary_in, record_size,
+                               args.block_size):
+        if encode:
+            if binary_in:
+                elements = array.array(typecode)
+                elements.frombytes(block)
+                if swap:
+                    elements.byteswap()
+                objects = [elements[i:i + k]
+                           for i in range(0, len(elements), k)]
+            else:
+                objects = [list(map(int, line.split())) for line in block]
+            for obj in objects:
+                if (len(obj) != k or len(set(obj)) != k or
+                        k and not 0 <= min(obj) <= max(obj) < universe):
+                    raise ValueError(
+                        'Objects must have %d distinct elements in [0, %d), '
+                        'got %s' % (k, universe, list(obj)))
+            if batched:
+                results = combinatorist.encode_combinations(objects).tolist()
+            else:
+                results = [encoder(obj) for obj in objects]
+        else:
+            if binary_in:
+                encs = [int.from_bytes(block[i:i + rank_width], 'little')
+                        for i in range(0, len(block), rank_width)]
+            else:
+                encs = list(map(int, block))
+            if encs and not 0 <= min(encs) <= max(encs) < size:
+                raise ValueError('Encodings must be in [0, %d)' % size)
+            if batched:
+                results = combinatorist.decode_combinations(encs).tolist()
+            else:
+                results = [decoder(enc) for enc in encs]
+        count += len(results)
+
+        if not binary_out:
+            if encode:
+                lines = map(str, results)
+            else:
+                lines = (' '.join(map(str, r)) for r in results)
+            outfile.write(''.join(line + '\n' for line in lines).encode())
+        elif encode:
+            outfile.write(b''.join(enc.to_bytes(rank_width, 'little')
+                                   for enc in results))
+        else:
+            elements = array.array(typecode, itertools.chain(*results))
+            if swap:
+                elements.byteswap()
+            outfile.write(elements.tobytes())
+    return count
+
+
+def main(argv=None):
     """Process args and run combinatorial computations.
+
+    Invalid records exit with an error message and status 1.
+
+    Args:
+      argv: list of str, arguments to parse, sys.argv[1:] if None.
     """
-    args = parse_args()
+    args = parse_args(argv)
     combinatorist = Combinatorist(args)
+    if args.command is None:
+        return
+    infile = (sys.stdin.buffer if args.input == '-'
+              else open(args.input, 'rb'))
+    outfile = (sys.stdout.buffer if args.output == '-'
+               else open(args.output, 'wb'))
+    try:
+        _convert(combinatorist, args, infile, outfile)
+    except ValueError as e:
+        sys.exit('error: %s' % (e,))
+    finally:
+        if infile is not sys.stdin.buffer:
+            infile.close()
+        if outfile is sys.stdout.buffer:
+            outfile.flush()
+        else:
+            outfile.close()
 
 
 if __name__ == '__main__':
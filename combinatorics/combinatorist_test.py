@@ -1,10 +1,26 @@
 #!/usr/bin/env python
 
+import argparse
+import collections
+import contextlib
+import io
+import math
+import os
+import random
+import tempfile
 import unittest
 
-from combinatorist import Combinatorist
+from algorithms.ds.fenwick import Fenwick
+from algorithms.search.binary_search import binary_search
+from combinatorist import (KINDS, BinomialCache, Combinatorist, main,
+                          space_size)
 from namedlist import namedlist
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class CombinatoristTest(unittest.TestCase):
 
@@ -19,6 +35,53 @@ class CombinatoristTest(unittest.TestCase):
             [1, 8, 28, 56], [1, 9, 36, 84], [1, 10, 45, 120]
         ]
         self.assertEqual(expected, combinatorist.binom)
+        # Built once per instance.
+        self.assertIs(combinatorist.binom, combinatorist.binom)
+
+    def test_binomial_cache_grows_in_place(self):
+        cache = BinomialCache()
+        small = cache.columns(3, 1)
+        first_column = small[1]
+        columns = cache.columns(6, 3)
+        self.assertIs(first_column, columns[1])
+        for j in range(4):
+            self.assertEqual([math.comb(m, j) for m in range(7)],
+                             columns[j][:7])
+        # Smaller requests are served from the cache.
+        self.assertIs(columns, cache.columns(2, 2))
+        self.assertEqual(7, len(cache.columns(2, 2)[3]))
+
+    def test_binomial_cache_mixed_shapes(self):
+        cache = BinomialCache()
+        cache.columns(10**5, 2)
+        columns = cache.columns(30, 15)
+        # Columns past k = 2 only grow as far as n = 30 needs.
+        self.assertEqual(10**5 + 1, len(columns[2]))
+        for j in range(3, 16):
+            self.assertEqual(31, len(columns[j]))
+        for j in range(16):
+            self.assertEqual([math.comb(m, j) for m in range(31)],
+                             columns[j][:31])
+        self.assertEqual(math.comb(10**5, 2), columns[2][10**5])
+
+        Args = namedlist('Args', ['n', 'k'])
+        large_n = Combinatorist(Args(n=10**5, k=2))
+        self.assertEqual([10**5 - 2, 10**5 - 1],
+                         large_n.decode_combination(math.comb(10**5, 2) - 1))
+        small_n = Combinatorist(Args(n=40, k=20))
+        self.assertEqual(list(range(20, 40)),
+                         small_n.decode_combination(math.comb(40, 20) - 1))
+        self.assertEqual(list(range(20, 40)),
+                         small_n.decode_combination_without_table(
+                             math.comb(40, 20) - 1))
+
+    def test_shared_binom(self):
+        Args = namedlist('Args', ['n', 'k'])
+        first = Combinatorist(Args(n=12, k=4))
+        second = Combinatorist(Args(n=8, k=2))
+        self.assertIs(first._binom_columns[2], second._binom_columns[2])
+        self.assertEqual(9, len(second.binom))
+        self.assertEqual(3, len(second.binom[0]))
 
     def test_encode_combination(self):
         Args = namedlist('Args', ['n', 'k'])
@@ -82,6 +145,110 @@ class CombinatoristTest(unittest.TestCase):
         self.assertEqual([2, 3, 4, 5], combinatorist.decode_combination(14))
         self.assertEqual([0, 1, 2, 6], combinatorist.decode_combination(15))
 
+    def test_without_table(self):
+        Args = namedlist('Args', ['n', 'k'])
+        for n, k in [(10, 4), (6, 6), (7, 1), (5, 0), (9, 8)]:
+            combinatorist = Combinatorist(Args(n=n, k=k))
+            for enc in range(math.comb(n, k)):
+                combination = combinatorist.decode_combination(enc)
+                self.assertEqual(
+                    combination,
+                    combinatorist.decode_combination_without_table(enc))
+                self.assertEqual(
+                    enc,
+                    combinatorist.encode_combination_without_table(
+                        combination))
+
+    def test_without_table_huge_n(self):
+        Args = namedlist('Args', ['n', 'k'])
+        combinatorist = Combinatorist(Args(n=10**6, k=3))
+        combination = [17, 5 * 10**5, 10**6 - 1]
+        enc = combinatorist.encode_combination_without_table(combination)
+        self.assertEqual(combination,
+                         combinatorist.decode_combination_without_table(enc))
+        # The table was never built.
+        self.assertIsNone(combinatorist._columns)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_batched_combinations(self):
+        Args = namedlist('Args', ['n', 'k'])
+        for n, k in [(10, 4), (6, 6), (7, 1), (9, 8)]:
+            combinatorist = Combinatorist(Args(n=n, k=k))
+            encs = list(range(math.comb(n, k)))
+            combinations = [combinatorist.decode_combination(enc)
+                            for enc in encs]
+            decoded = combinatorist.decode_combinations(encs)
+            self.assertEqual(numpy.int64, decoded.dtype)
+            self.assertEqual(combinations, decoded.tolist())
+            shuffled = [list(reversed(c)) for c in combinations]
+            encoded = combinatorist.encode_combinations(shuffled)
+            self.assertEqual(numpy.uint64, encoded.dtype)
+            self.assertEqual(encs, encoded.tolist())
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_batched_combinations_uint64_limit(self):
+        Args = namedlist('Args', ['n', 'k'])
+        # binom(68, 60) fits, but e.g. binom(68, 34) in the table saturates.
+        combinatorist = Combinatorist(Args(n=68, k=60))
+        last = list(range(8, 68))
+        encs = [0, math.comb(68, 60) // 3, math.comb(68, 60) - 1]
+        expected = [combinatorist.decode_combination(enc) for enc in encs]
+        self.assertEqual(last, expected[-1])
+        self.assertEqual(expected,
+                         combinatorist.decode_combinations(encs).tolist())
+        self.assertEqual(encs,
+                         combinatorist.encode_combinations(expected).tolist())
+
+        with self.assertRaises(ValueError):
+            Combinatorist(Args(n=70, k=35)).decode_combinations([0])
+
+    def test_iter_combinations(self):
+        Args = namedlist('Args', ['n', 'k'])
+        for n, k in [(10, 4), (6, 6), (7, 1), (5, 0)]:
+            combinatorist = Combinatorist(Args(n=n, k=k))
+            total = math.comb(n, k)
+            for a, b in [(0, total), (total // 3, total), (1, 1)]:
+                expected = [tuple(combinatorist.decode_combination(enc))
+                            for enc in range(a, b)]
+                self.assertEqual(expected,
+                                 list(combinatorist.iter_combinations(a, b)))
+        combinatorist = Combinatorist(Args(n=10, k=4))
+        buffers = list(combinatorist.iter_combinations(3, 7, reuse=True))
+        self.assertTrue(all(buf is buffers[0] for buf in buffers))
+        # The buffer holds the last combination, encoding 6.
+        self.assertEqual([0, 1, 3, 5], buffers[0])
+
+        combinatorist = Combinatorist(Args(n=5, k=2))
+        for a, b in [(8, 12), (-1, 3), (4, 3)]:
+            with self.assertRaises(ValueError):
+                list(combinatorist.iter_combinations(a, b))
+
+    def test_iter_permutations(self):
+        for k in range(1, 6):
+            total = math.factorial(k)
+            for a, b in [(0, total), (total // 2, total - 1)]:
+                expected = [tuple(Combinatorist.decode_permutation(enc, k))
+                            for enc in range(a, b)]
+                self.assertEqual(
+                    expected, list(Combinatorist.iter_permutations(a, b, k)))
+        with self.assertRaises(ValueError):
+            list(Combinatorist.iter_permutations(4, 8, 3))
+
+    def test_iter_variations(self):
+        Args = namedlist('Args', ['n', 'k'])
+        for n, k in [(3, 2), (6, 3), (5, 5), (4, 1)]:
+            combinatorist = Combinatorist(Args(n=n, k=k))
+            total = math.perm(n, k)
+            for a, b in [(0, total), (total // 3, total // 2 + 1)]:
+                expected = [tuple(combinatorist.decode_variation(enc))
+                            for enc in range(a, b)]
+                self.assertEqual(expected,
+                                 list(combinatorist.iter_variations(a, b)))
+        combinatorist = Combinatorist(Args(n=4, k=2))
+        self.assertEqual([(3, 2)], list(combinatorist.iter_variations(11, 12)))
+        with self.assertRaises(ValueError):
+            list(combinatorist.iter_variations(11, 13))
+
     def test_k_0(self):
         Args = namedlist('Args', ['n', 'k'])
         args = Args(n=10, k=0)
@@ -187,6 +354,74 @@ class CombinatoristTest(unittest.TestCase):
         self.assertEqual(4, Combinatorist.encode_permutation([2, 0, 1]))
         self.assertEqual(5, Combinatorist.encode_permutation([2, 1, 0]))
 
+    def test_permutation_round_trip(self):
+        for enc in range(math.factorial(5)):
+            permutation = Combinatorist.decode_permutation(enc, 5)
+            self.assertEqual(list(range(5)), sorted(permutation))
+            self.assertEqual(enc, Combinatorist.encode_permutation(permutation))
+
+    def test_long_permutations(self):
+        rng = random.Random(20)
+        for k in [1, 2, 63, 64, 65, 129, 300, 1000]:
+            lehmer = [rng.randrange(k - i) for i in range(k)]
+            # Horner's rule on the factorial base digits.
+            enc = 0
+            for i, digit in enumerate(lehmer):
+                enc = enc * (k - i) + digit
+            self.assertEqual(lehmer,
+                             Combinatorist.lehmer_code_from_encoding(enc, k))
+            permutation = Combinatorist.decode_permutation(enc, k)
+            self.assertEqual(lehmer,
+                             Combinatorist.lehmer_code_from_permutation(
+                                 permutation))
+            self.assertEqual(enc, Combinatorist.encode_permutation(permutation))
+
+    def test_lehmer_code_exact(self):
+        # The last permutation of length 30 is beyond float precision.
+        self.assertEqual(list(range(29, -1, -1)),
+                         Combinatorist.lehmer_code_from_encoding(
+                             math.factorial(30) - 1, 30))
+        self.assertEqual(list(range(200)),
+                         Combinatorist.decode_permutation(0, 200))
+        self.assertEqual(math.factorial(200) - 1,
+                         Combinatorist.encode_permutation(
+                             list(range(199, -1, -1))))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_bulk_lehmer_code(self):
+        rng = random.Random(21)
+        for k in [1, 2, 7, 64, 100, 1025]:
+            permutation = list(range(k))
+            rng.shuffle(permutation)
+            fenwick = Fenwick([0] * k, range_updates=False)
+            expected = []
+            for e in permutation:
+                expected.append(e - fenwick.sum(e))
+                fenwick.add(e, 1)
+            self.assertEqual(
+                expected,
+                Combinatorist._bulk_lehmer_code(permutation).tolist())
+            self.assertEqual(expected,
+                             Combinatorist.lehmer_code_from_permutation(
+                                 permutation))
+            self.assertEqual(sum(expected),
+                             Combinatorist.count_inversions(permutation))
+
+    def test_count_inversions(self):
+        self.assertEqual(0, Combinatorist.count_inversions([]))
+        self.assertEqual(0, Combinatorist.count_inversions([0, 1, 2, 3]))
+        self.assertEqual(3, Combinatorist.count_inversions([1, 3, 0, 2]))
+        k = 5000
+        self.assertEqual(k * (k - 1) // 2, Combinatorist.count_inversions(
+            list(range(k - 1, -1, -1))))
+
+    def test_prefix_sum_bsearch_predicate(self):
+        fenwick = Fenwick([1, 0, 0, 1, 1], range_updates=False)
+        for prefix_sum, expected in [(0, 0), (1, 0), (2, 3), (3, 4), (4, 5)]:
+            pred = Combinatorist._get_prefix_sum_bsearch_predicate(
+                fenwick, prefix_sum)
+            self.assertEqual(expected, binary_search(0, 5, pred))
+
     def test_encode_variation(self):
         Args = namedlist('Args', ['n', 'k'])
         args = Args(n=3, k=2)
@@ -213,6 +448,259 @@ class CombinatoristTest(unittest.TestCase):
         self.assertEqual([1, 2], combinatorist.decode_variation(4))
         self.assertEqual([2, 1], combinatorist.decode_variation(5))
 
+    def test_revolving_door(self):
+        for n, k in [(1, 1), (5, 0), (6, 6), (7, 1), (7, 3), (8, 4), (9, 5)]:
+            combinatorist = Combinatorist(argparse.Namespace(n=n, k=k))
+            size = math.comb(n, k)
+            steps = list(combinatorist.iter_revolving_door(0, size))
+            self.assertEqual(size, len(set(c for c, _ in steps)))
+            self.assertIsNone(steps[0][1])
+            for enc, (combination, delta) in enumerate(steps):
+                self.assertEqual(list(combination),
+                                 combinatorist.decode_revolving_door(enc))
+                self.assertEqual(
+                    enc, combinatorist.encode_revolving_door(combination))
+                if enc:
+                    previous = set(steps[enc - 1][0])
+                    out, into = delta
+                    self.assertEqual({out}, previous - set(combination))
+                    self.assertEqual({into}, set(combination) - previous)
+            self.assertEqual(
+                steps[size // 3:size // 2][1:],
+                list(combinatorist.iter_revolving_door(size // 3,
+                                                       size // 2))[1:])
+
+        combinatorist = Combinatorist(argparse.Namespace(n=5, k=2))
+        self.assertEqual(
+            [[0, 1], [1, 2], [0, 2], [2, 3], [1, 3], [0, 3], [3, 4], [2, 4],
+             [1, 4], [0, 4]],
+            [list(c) for c, _ in combinatorist.iter_revolving_door(
+                0, 10, reuse=True)])
+        self.assertEqual([], list(combinatorist.iter_revolving_door(10, 10)))
+        for a, b in [(8, 12), (-1, 3), (4, 3)]:
+            with self.assertRaises(ValueError):
+                list(combinatorist.iter_revolving_door(a, b))
+
+    def test_revolving_door_incremental(self):
+        # A sum of weights kept up to date from the deltas.
+        n = 10
+        k = 4
+        weights = [3 ** i % 17 for i in range(n)]
+        combinatorist = Combinatorist(argparse.Namespace(n=n, k=k))
+        total = None
+        for combination, delta in combinatorist.iter_revolving_door(
+                0, math.comb(n, k), reuse=True):
+            if delta is None:
+                total = sum(weights[e] for e in combination)
+            else:
+                total += weights[delta[1]] - weights[delta[0]]
+            self.assertEqual(sum(weights[e] for e in combination), total)
+
+    def test_plain_changes(self):
+        self.assertEqual(
+            [(0, 1, 2), (0, 2, 1), (2, 0, 1), (2, 1, 0), (1, 2, 0),
+             (1, 0, 2)],
+            [p for p, _ in Combinatorist.iter_plain_changes(0, 6, 3)])
+        for k in range(1, 7):
+            size = math.factorial(k)
+            steps = list(Combinatorist.iter_plain_changes(0, size, k))
+            self.assertEqual(size, len(set(p for p, _ in steps)))
+            for enc, (permutation, swap) in enumerate(steps):
+                self.assertEqual(list(permutation),
+                                 Combinatorist.decode_plain_changes(enc, k))
+                self.assertEqual(
+                    enc, Combinatorist.encode_plain_changes(permutation))
+                if enc:
+                    previous = list(steps[enc - 1][0])
+                    previous[swap], previous[swap + 1] = (previous[swap + 1],
+                                                          previous[swap])
+                    self.assertEqual(tuple(previous), permutation)
+            for a in range(0, size, 7):
+                self.assertEqual(
+                    steps[a + 1:],
+                    list(Combinatorist.iter_plain_changes(a, size, k))[1:])
+        for a, b in [(4, 8), (-1, 3), (4, 3)]:
+            with self.assertRaises(ValueError):
+                list(Combinatorist.iter_plain_changes(a, b, 3))
+
+        # Long permutations round trip.
+        permutation = Combinatorist.decode_permutation(10**60, 60)
+        self.assertEqual(permutation, Combinatorist.decode_plain_changes(
+            Combinatorist.encode_plain_changes(permutation), 60))
+
+    def assert_uniform(self, counts, size, draws):
+        self.assertEqual(size, len(counts))
+        expected = draws / size
+        # Counts are binomial, within 5 standard deviations of expected.
+        for count in counts.values():
+            self.assertLess(abs(count - expected), 5 * math.sqrt(expected))
+
+    def test_sample(self):
+        combinatorist = Combinatorist(argparse.Namespace(n=6, k=3))
+        rng = random.Random(24)
+        draws = 12000
+        counts = collections.Counter()
+        for _ in range(draws):
+            combination, enc = combinatorist.sample_combination(
+                rng, with_rank=True)
+            self.assertEqual(combinatorist.decode_combination(enc),
+                             combination)
+            counts[enc] += 1
+        self.assert_uniform(counts, 20, draws)
+
+        counts = collections.Counter()
+        for _ in range(draws):
+            permutation, enc = Combinatorist.sample_permutation(
+                4, rng, with_rank=True)
+            self.assertEqual(Combinatorist.decode_permutation(enc, 4),
+                             permutation)
+            counts[enc] += 1
+        self.assert_uniform(counts, 24, draws)
+
+        counts = collections.Counter()
+        for _ in range(draws):
+            variation, enc = combinatorist.sample_variation(
+                rng, with_rank=True)
+            self.assertEqual(combinatorist.decode_variation(enc), variation)
+            counts[enc] += 1
+        self.assert_uniform(counts, 120, draws)
+
+    def test_sample_seeded(self):
+        combinatorist = Combinatorist(argparse.Namespace(n=10**9, k=5))
+        first = combinatorist.sample_variations(3, random.Random(7))
+        self.assertEqual(first,
+                         combinatorist.sample_variations(3, random.Random(7)))
+        for variation in first:
+            self.assertEqual(5, len(set(variation)))
+        combinations, ranks = combinatorist.sample_combinations(
+            4, random.Random(7), with_rank=True)
+        self.assertEqual(4, len(ranks))
+        for combination, enc in zip(combinations, ranks):
+            self.assertEqual(combination, sorted(combination))
+            self.assertEqual(
+                enc, sum(math.comb(e, i + 1)
+                         for i, e in enumerate(combination)))
+        self.assertEqual(([], []), combinatorist.sample_combinations(
+            0, with_rank=True))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_sample_numpy(self):
+        combinatorist = Combinatorist(argparse.Namespace(n=6, k=3))
+        draws = 12000
+        combinations, ranks = combinatorist.sample_combinations(
+            draws, numpy.random.default_rng(24), with_rank=True)
+        self.assertEqual((draws, 3), combinations.shape)
+        self.assertEqual(combinations[:50].tolist(),
+                         [combinatorist.decode_combination(e)
+                          for e in ranks[:50]])
+        self.assert_uniform(collections.Counter(ranks), 20, draws)
+
+        permutations, ranks = Combinatorist.sample_permutations(
+            draws, 4, numpy.random.default_rng(24), with_rank=True)
+        self.assertEqual(permutations[:50].tolist(),
+                         [Combinatorist.decode_permutation(e, 4)
+                          for e in ranks[:50]])
+        self.assert_uniform(collections.Counter(ranks), 24, draws)
+
+        variations, ranks = combinatorist.sample_variations(
+            draws, numpy.random.default_rng(24), with_rank=True)
+        self.assertEqual(variations[:50].tolist(),
+                         [combinatorist.decode_variation(e)
+                          for e in ranks[:50]])
+        self.assert_uniform(collections.Counter(ranks), 120, draws)
+
+        # Large k draws one row at a time, binom(67, 66) = 67 outcomes.
+        combinatorist = Combinatorist(argparse.Namespace(n=67, k=66))
+        draws = 6700
+        combinations, ranks = combinatorist.sample_combinations(
+            draws, numpy.random.default_rng(24), with_rank=True)
+        self.assertEqual((draws, 66), combinations.shape)
+        self.assertEqual(combinations[:50].tolist(),
+                         [combinatorist.decode_combination(e)
+                          for e in ranks[:50]])
+        self.assert_uniform(collections.Counter(ranks), 67, draws)
+        variations = combinatorist.sample_variations(
+            10, numpy.random.default_rng(24))
+        self.assertEqual([66] * 10, [len(set(v)) for v in variations.tolist()])
+
+    def run_main(self, argv, data, block_size=7):
+        with tempfile.TemporaryDirectory() as directory:
+            infile = os.path.join(directory, 'in')
+            outfile = os.path.join(directory, 'out')
+            with open(infile, 'wb') as f:
+                f.write(data)
+            main(argv + ['-i', infile, '-o', outfile,
+                         '--block-size', str(block_size)])
+            with open(outfile, 'rb') as f:
+                return f.read()
+
+    def assert_main_fails(self, argv, data):
+        """Invalid records exit with an error message, not a traceback.
+        """
+        with self.assertRaises(SystemExit) as cm:
+            self.run_main(argv, data)
+        self.assertTrue(str(cm.exception.code).startswith('error: '))
+
+    def test_main_text(self):
+        combinatorist = Combinatorist(argparse.Namespace(n=9, k=3))
+        for kind in KINDS:
+            size = space_size(kind, 9, 3)
+            decoded = self.run_main(
+                ['-n', '9', '-k', '3', 'decode', kind],
+                ''.join('%d\n' % e for e in range(size)).encode())
+            lines = decoded.decode().splitlines()
+            self.assertEqual(size, len(lines))
+            if kind == 'combination':
+                self.assertEqual(
+                    ' '.join(map(str, combinatorist.decode_combination(50))),
+                    lines[50])
+            encoded = self.run_main(['-n', '9', '-k', '3', 'encode', kind],
+                                    decoded)
+            self.assertEqual(list(range(size)),
+                             [int(line) for line in encoded.splitlines()])
+            self.assert_main_fails(['-n', '9', '-k', '3', 'decode', kind],
+                                   b'%d\n' % size)
+            for record in (b'0 1\n2 3\n4 5\n', b'0 1 2 3\n', b'1 1 2\n',
+                           b'0 1 9\n', b'0 -1 2\n'):
+                self.assert_main_fails(
+                    ['-n', '9', '-k', '3', 'encode', kind], record)
+        self.assert_main_fails(
+            ['-n', '9', '-k', '3', 'encode', 'permutation'], b'0 1 3\n')
+
+        for block_size in (0, -1):
+            with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                with self.assertRaises(SystemExit) as cm:
+                    self.run_main(['-n', '9', '-k', '3', 'decode', kind],
+                                  b'0\n', block_size)
+            self.assertEqual(2, cm.exception.code)
+            self.assertIn('--block-size', stderr.getvalue())
+
+    def test_main_binary(self):
+        # 2 byte elements and 7 byte encodings.
+        n = 300
+        k = 6
+        rng = random.Random(23)
+        size = space_size('variation', n, k)
+        encs = [rng.randrange(size) for _ in range(20)]
+        data = b''.join(e.to_bytes(7, 'little') for e in encs)
+        decoded = self.run_main(
+            ['-n', str(n), '-k', str(k), 'decode', 'variation',
+             '--input-format', 'binary', '--output-format', 'binary'], data)
+        self.assertEqual(20 * k * 2, len(decoded))
+        text = self.run_main(
+            ['-n', str(n), '-k', str(k), 'encode', 'variation',
+             '--input-format', 'binary'], decoded)
+        self.assertEqual(encs, [int(line) for line in text.splitlines()])
+        encoded = self.run_main(
+            ['-n', str(n), '-k', str(k), 'encode', 'variation',
+             '--input-format', 'binary', '--output-format', 'binary'],
+            decoded)
+        self.assertEqual(data, encoded)
+
+        self.assert_main_fails(
+            ['-n', str(n), '-k', str(k), 'decode', 'variation',
+             '--input-format', 'binary'], data[:-1])
+
 
 if __name__ == '__main__':
     unittest.main()
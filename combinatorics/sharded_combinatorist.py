@@ -0,0 +1,232 @@
+"""Parallel encoding and decoding of combinatorial objects.
+
+The encodings of the combinations, permutations and variations of
+Combinatorist are dense ranges of integers. A range is cut into chunks that
+worker processes decode independently: every chunk is decoded once at its
+start and stepped through in order from there. Streams of objects to encode
+are cut into batches the same way.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import os
+
+from algorithms.combinatorics.combinatorist import Combinatorist, space_size
+
+# Combinatorists of the process by (n, k). A worker builds the binomial
+# table of n and k once, for the first chunk that needs it.
+_combinatorists = {}
+
+
+def _combinatorist(n, k):
+    """Get the combinatorist of the process for n and k.
+
+    Args:
+      n: int, size of the set.
+      k: int, size of the subsets.
+
+    Return:
+      Combinatorist.
+    """
+    key = (n, k)
+    if key not in _combinatorists:
+        _combinatorists[key] = Combinatorist(argparse.Namespace(n=n, k=k))
+    return _combinatorists[key]
+
+
+def decode_chunk(kind, n, k, start, stop, reducer=None):
+    """Decode the encodings in [start, stop).
+
+    This is the work done by every worker process.
+
+    Args:
+      kind: str, one of KINDS.
+      n: int, size of the set. Unused for permutations.
+      k: int, size of the objects.
+      start: int, first encoding, inclusive.
+      stop: int, last encoding, exclusive.
+      reducer: function, called with an iterator over the decoded objects.
+        Must be picklable, e.g. a module level function.
+
+    Raises:
+      ValueError, for an unknown kind.
+
+    Return:
+      list of tuples, the decoded objects in order, or the result of
+      reducer if given.
+    """
+    if kind == 'combination':
+        objects = _combinatorist(n, k).iter_combinations(start, stop)
+    elif kind == 'permutation':
+        objects = Combinatorist.iter_permutations(start, stop, k)
+    elif kind == 'variation':
+        objects = _combinatorist(n, k).iter_variations(start, stop)
+    else:
+        raise ValueError('Unknown kind %r' % (kind,))
+    if reducer is None:
+        return list(objects)
+    return reducer(objects)
+
+
+def encode_chunk(kind, n, k, objects):
+    """Encode a batch of objects.
+
+    This is the work done by every worker process.
+
+    Args:
+      kind: str, one of KINDS.
+      n: int, size of the set. Unused for permutations.
+      k: int, size of the objects.
+      objects: list of lists/tuples.
+
+    Raises:
+      ValueError, for an unknown kind.
+
+    Return:
+      list of int, the encodings.
+    """
+    if kind == 'combination':
+        encode = _combinatorist(n, k).encode_combination
+    elif kind == 'permutation':
+        encode = Combinatorist.encode_permutation
+    elif kind == 'variation':
+        encode = _combinatorist(n, k).encode_variation
+    else:
+        raise ValueError('Unknown kind %r' % (kind,))
+    return [encode(obj) for obj in objects]
+
+
+def _stream(tasks, executor, max_pending, ordered):
+    """Run tasks on an executor and generate their results.
+
+    At most max_pending tasks are in flight. Tasks are only submitted as
+    results are consumed, so a slow consumer holds back the workers.
+
+    Args:
+      tasks: iterable of (function, args) pairs.
+      executor: concurrent.futures.Executor, a ProcessPoolExecutor is
+        created for the stream if None.
+      max_pending: int, tasks in flight, twice the CPU count if None.
+      ordered: bool, generate the results in the order of tasks instead of
+        in the order they are done.
+
+    Return:
+      generator of results.
+    """
+    if max_pending is None:
+        max_pending = 2 * (os.cpu_count() or 1)
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ProcessPoolExecutor()
+    pending = collections.deque()
+    tasks = iter(tasks)
+    try:
+        while True:
+            for function, args in itertools.islice(
+                    tasks, max_pending - len(pending)):
+                pending.append(executor.submit(function, *args))
+            if not pending:
+                break
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+            yield future.result()
+    finally:
+        # Only reached early if the consumer stopped or a task failed.
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown()
+
+
+def _flatten(results):
+    """Generate the elements of a stream of lists.
+
+    Args:
+      results: generator of lists from _stream(), closed with this one.
+
+    Return:
+      generator of the elements.
+    """
+    try:
+        for result in results:
+            yield from result
+    finally:
+        results.close()
+
+
+def decode_range(kind, n, k, start=0, stop=None, reducer=None,
+                 executor=None, chunk_size=1 << 12, max_pending=None,
+                 ordered=True):
+    """Decode the encodings in [start, stop) using worker processes.
+
+    Args:
+      kind: str, one of KINDS.
+      n: int, size of the set. Unused for permutations.
+      k: int, size of the objects.
+      start: int, first encoding, inclusive.
+      stop: int, last encoding, exclusive. All encodings if None.
+      reducer: function, applied to an iterator over the decoded objects
+        of every chunk in the worker. Must be picklable.
+      executor: concurrent.futures.Executor, a ProcessPoolExecutor is
+        created for the call if None.
+      chunk_size: int, number of encodings per chunk.
+      max_pending: int, chunks in flight, twice the CPU count if None.
+      ordered: bool, generate chunks in the order of their encodings
+        instead of in the order they are done.
+
+    Raises:
+      ValueError, for an unknown kind or encodings out of range.
+
+    Return:
+      generator of the decoded objects as tuples, or of the results of
+      reducer, one per chunk.
+    """
+    size = space_size(kind, n, k)
+    if stop is None:
+        stop = size
+    if not 0 <= start <= stop <= size:
+        raise ValueError('Encodings [%d, %d) out of range [0, %d)' %
+                         (start, stop, size))
+    tasks = ((decode_chunk, (kind, n, k, a, min(a + chunk_size, stop),
+                             reducer))
+             for a in range(start, stop, chunk_size))
+    results = _stream(tasks, executor, max_pending, ordered)
+    if reducer is not None:
+        return results
+    return _flatten(results)
+
+
+def encode_stream(kind, n, k, objects, executor=None, batch_size=1 << 12,
+                  max_pending=None, ordered=True):
+    """Encode a stream of objects using worker processes.
+
+    Args:
+      kind: str, one of KINDS.
+      n: int, size of the set. Unused for permutations.
+      k: int, size of the objects.
+      objects: iterable of lists/tuples.
+      executor: concurrent.futures.Executor, a ProcessPoolExecutor is
+        created for the call if None.
+      batch_size: int, number of objects per batch.
+      max_pending: int, batches in flight, twice the CPU count if None.
+      ordered: bool, generate encodings in the order of objects instead of
+        in the order their batches are done.
+
+    Raises:
+      ValueError, for an unknown kind.
+
+    Return:
+      generator of int, the encodings.
+    """
+    space_size(kind, n, k)
+    objects = iter(objects)
+    batches = iter(lambda: list(itertools.islice(objects, batch_size)), [])
+    tasks = ((encode_chunk, (kind, n, k, batch)) for batch in batches)
+    return _flatten(_stream(tasks, executor, max_pending, ordered))
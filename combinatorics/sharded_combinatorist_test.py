@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+import argparse
+import concurrent.futures
+import math
+import unittest
+
+from combinatorist import Combinatorist
+from sharded_combinatorist import (decode_chunk, decode_range, encode_stream,
+                                   space_size)
+
+
+def count_and_sum(objects):
+    """Reducer for the tests, must be picklable.
+    """
+    count = 0
+    total = 0
+    for obj in objects:
+        count += 1
+        total += sum(obj)
+    return count, total
+
+
+class ShardedCombinatoristTest(unittest.TestCase):
+
+    def test_space_size(self):
+        self.assertEqual(120, space_size('combination', 10, 3))
+        self.assertEqual(6, space_size('permutation', 10, 3))
+        self.assertEqual(720, space_size('variation', 10, 3))
+        with self.assertRaises(ValueError):
+            space_size('arrangement', 10, 3)
+
+    def test_decode_chunk(self):
+        combinatorist = Combinatorist(argparse.Namespace(n=7, k=3))
+        self.assertEqual(
+            [tuple(combinatorist.decode_combination(e)) for e in range(4, 9)],
+            decode_chunk('combination', 7, 3, 4, 9))
+        self.assertEqual(
+            [tuple(Combinatorist.decode_permutation(e, 3)) for e in range(6)],
+            decode_chunk('permutation', 7, 3, 0, 6))
+        self.assertEqual(
+            [tuple(combinatorist.decode_variation(e)) for e in range(7, 30)],
+            decode_chunk('variation', 7, 3, 7, 30))
+        self.assertEqual((5, 5 * 3), decode_chunk(
+            'permutation', 7, 3, 1, 6, count_and_sum))
+
+    def test_decode_range(self):
+        n = 8
+        k = 3
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            for kind in ('combination', 'permutation', 'variation'):
+                expected = decode_chunk(kind, n, k, 0, space_size(kind, n, k))
+                decoded = decode_range(kind, n, k, executor=executor,
+                                       chunk_size=7, max_pending=2)
+                self.assertEqual(expected, list(decoded))
+                stop = min(40, len(expected))
+                decoded = decode_range(kind, n, k, 1, stop, executor=executor,
+                                       chunk_size=5, ordered=False)
+                self.assertEqual(sorted(expected[1:stop]), sorted(decoded))
+            with self.assertRaises(ValueError):
+                decode_range('permutation', n, k, 0, 7)
+
+            results = list(decode_range('variation', n, k,
+                                        reducer=count_and_sum,
+                                        executor=executor, chunk_size=50))
+            self.assertEqual(math.ceil(math.perm(n, k) / 50), len(results))
+            self.assertEqual(math.perm(n, k),
+                             sum(count for count, _ in results))
+            # Every element is in the same number of variations.
+            self.assertEqual(math.perm(n, k) * k * (n - 1) // 2,
+                             sum(total for _, total in results))
+
+    def test_decode_range_stops_early(self):
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            decoded = decode_range('permutation', 0, 12, executor=executor,
+                                   chunk_size=100, max_pending=2)
+            first = [next(decoded) for _ in range(150)]
+            decoded.close()
+        self.assertEqual(decode_chunk('permutation', 0, 12, 0, 150), first)
+
+    def test_encode_stream(self):
+        n = 9
+        k = 4
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            for kind in ('combination', 'permutation', 'variation'):
+                size = space_size(kind, n, k)
+                objects = decode_chunk(kind, n, k, 0, size)
+                encoded = encode_stream(kind, n, k, iter(objects), executor,
+                                        batch_size=10, max_pending=3)
+                self.assertEqual(list(range(size)), list(encoded))
+                encoded = encode_stream(kind, n, k, objects, executor,
+                                        batch_size=7, ordered=False)
+                self.assertEqual(list(range(size)), sorted(encoded))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,27 +4,287 @@ For a reference see here:
   https://goo.gl/T83PC1
 """
 
+import array
+import itertools
+import mmap
+import struct
+import sys
+import types
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from algorithms.profiling import instrumentation
+except ImportError:
+    # Imported on its own, outside of the algorithms package. A registry
+    # is never active then.
+    instrumentation = types.SimpleNamespace(registry=None)
+
+
+# Typecodes of the array module for the supported fixed width dtypes.
+_TYPECODES = {'int64': 'q', 'float64': 'd'}
+_INT64_MAX = 2**63 - 1
+
+# Header of saved trees: magic, range_updates, dtype code, padding, n.
+_HEADER = struct.Struct('<8s?B6xQ')
+_MAGIC = b'FENWICK1'
+_DTYPE_CODES = {'int64': 0, 'float64': 1}
+_SAVED_DTYPES = {'int64': '<i8', 'float64': '<f8'}
+# Access modes of Fenwick.open(), same letters as numpy.memmap.
+_ACCESS = {'r': mmap.ACCESS_READ, 'r+': mmap.ACCESS_WRITE,
+           'c': mmap.ACCESS_COPY}
+
 
 class Fenwick(object):
 
-    def __init__(self, arr, range_updates=True):
+    def __init__(self, arr, range_updates=True, dtype=None, use_numpy=False):
         """Initialize the Fenwick tree.
 
+        By default the tree is stored in python lists of arbitrary precision
+        numbers. With dtype set the tree is stored in flat 8 byte buffers
+        instead, array.array or numpy arrays if use_numpy is set. That is
+        several times less memory than a list of int objects.
+
+        If dtype is 'int64' the tree keeps a bound on its nodes and on the
+        products computed by queries. When arr or a later update could push
+        it past the int64 range, the nodes are moved to list storage before
+        anything is written, and the numpy paths are dropped with it.
+
         Args:
           arr: list/tuple of numbers.
+          range_updates: bool, whether range updates are supported.
+          dtype: None, 'int64' or 'float64', type of the stored numbers.
+          use_numpy: bool, store the tree in numpy arrays. Needs dtype.
 
         Return:
           void
         """
+        if dtype is not None and dtype not in _TYPECODES:
+            raise ValueError('Unsupported dtype: %r' % (dtype,))
+        if use_numpy:
+            if dtype is None:
+                raise ValueError('use_numpy needs a dtype')
+            if numpy is None:
+                raise ImportError('use_numpy needs numpy')
         self._range_updates = range_updates
-        self._add = [0] * len(arr)
-        if range_updates:
-            self._mul = [0] * len(arr)
+        self._requested_dtype = dtype
+        self._requested_use_numpy = use_numpy
+        self._use_numpy = use_numpy
+        self._dtype = None
+        # Bound on the absolute values of the nodes and of the products
+        # computed by sum(), kept for 'int64' trees only. None until first
+        # needed for a tree returned by open().
+        self._magnitude = 0
+        # The memory map of a tree returned by open().
+        self._mmap = None
+        self._add = []
+        self._mul = []
+        self.rebuild(arr)
+
+    @classmethod
+    def from_iterable(cls, iterable, range_updates=True, dtype=None,
+                      use_numpy=False):
+        """Build a Fenwick tree from any iterable in linear time.
+
+        Args:
+          iterable: iterable of numbers.
+          range_updates: bool, whether range updates are supported.
+          dtype: None, 'int64' or 'float64', type of the stored numbers.
+          use_numpy: bool, store the tree in numpy arrays.
+
+        Return:
+          Fenwick, the new tree.
+        """
+        return cls(list(iterable), range_updates=range_updates, dtype=dtype,
+                   use_numpy=use_numpy)
+
+    def __len__(self):
+        return len(self._add)
+
+    @property
+    def dtype(self):
+        """The dtype of the storage, None for arbitrary precision lists.
+        """
+        return self._dtype
+
+    @property
+    def range_updates(self):
+        """Whether range updates are supported.
+        """
+        return self._range_updates
+
+    def rebuild(self, arr):
+        """Replace the contents of the tree with arr.
+
+        Complexity O(n). Every node is pushed once into its parent, instead
+        of doing an O(log(n)) update per element.
+
+        A point value only ever contributes to the additive part, so the
+        multiplicative part is all zeros after a rebuild.
+
+        Args:
+          arr: list/tuple of numbers.
+
+        Return:
+          void
+        """
+        self._dtype = self._requested_dtype
+        self._magnitude = 0
+        if self._dtype == 'int64':
+            self._magnitude = self._initial_magnitude(arr)
+            if self._magnitude > _INT64_MAX:
+                self._dtype = None
+        # numpy storage needs a dtype, list storage is plain python.
+        self._use_numpy = self._requested_use_numpy and self._dtype is not None
+        if self._dtype is None and isinstance(self._add, list):
+            # Reuse the existing list.
+            self._add[:] = arr
         else:
+            self._add = self._storage(arr)
+        Fenwick._build(self._add)
+        if not self._range_updates:
             # Alias self._mul to save on memory.
             self._mul = self._add
-        for i, e in enumerate(arr):
-            self.add(i, e)
+        elif self._dtype is None and isinstance(self._mul, list):
+            self._mul[:] = [0] * len(arr)
+        else:
+            self._mul = self._storage([0] * len(arr))
+
+    def _initial_magnitude(self, arr):
+        """Bound the nodes of a tree over arr and the products of its queries.
+
+        The nodes of the tree are bounded by the sum of absolute values. With
+        range updates the products computed by sum() can be up to n times
+        larger.
+
+        Args:
+          arr: list/tuple of numbers.
+
+        Return:
+          int, the bound.
+        """
+        bound = Fenwick._abs_sum(arr)
+        if self._range_updates:
+            bound *= max(len(arr), 1)
+        return bound
+
+    def _node_magnitude(self):
+        """Bound the nodes of this tree and the products of its queries.
+
+        Every node and every prefix sum of the additive part is bounded by
+        the sum of its absolute values, the multiplicative part is
+        multiplied by indexes below n.
+
+        Return:
+          int, the bound.
+        """
+        bound = Fenwick._abs_sum(self._add)
+        if self._range_updates:
+            bound += len(self._add) * Fenwick._abs_sum(self._mul)
+        return bound
+
+    @staticmethod
+    def _abs_sum(values):
+        """Sum the absolute values of numbers, exactly.
+
+        Args:
+          values: sequence of numbers, any storage.
+
+        Return:
+          int, the sum.
+        """
+        if (isinstance(values, (array.array, memoryview)) or
+                numpy is not None and isinstance(values, numpy.ndarray)):
+            values = values.tolist()
+        return sum(abs(int(e)) for e in values)
+
+    def _reserve(self, magnitude, transient=0):
+        """Make sure that updates cannot overflow an 'int64' tree.
+
+        Updates that could push the bound of the tree past the int64 range
+        move the nodes to list storage first, before any of them is written.
+        A tree returned by open() cannot leave its file and raises
+        OverflowError instead.
+
+        Args:
+          magnitude: int, bound on what the updates add to the nodes and to
+            the products of queries.
+          transient: int, bound on what the updates hold in the nodes only
+            until they are done.
+
+        Raises:
+          OverflowError, for a mapped tree.
+
+        Return:
+          void
+        """
+        if self._dtype != 'int64':
+            return
+        if self._magnitude is None:
+            self._magnitude = self._node_magnitude()
+        if self._magnitude + magnitude + transient > _INT64_MAX:
+            if self._mmap is not None:
+                raise OverflowError(
+                    'Update could overflow the int64 nodes of a mapped tree')
+            self._to_lists()
+            return
+        self._magnitude += magnitude
+
+    def _to_lists(self):
+        """Move the nodes to list storage, keeping their values.
+
+        Return:
+          void
+        """
+        self._add = self._add.tolist()
+        self._mul = self._mul.tolist() if self._range_updates else self._add
+        self._dtype = None
+        self._use_numpy = False
+        self._magnitude = 0
+
+    def _storage(self, values):
+        """Allocate a buffer of the current dtype holding values.
+
+        Args:
+          values: list/tuple of numbers.
+
+        Return:
+          list, array.array or numpy array.
+        """
+        if self._dtype is None:
+            return list(values)
+        if self._use_numpy:
+            return numpy.array(values, dtype=self._dtype)
+        return array.array(_TYPECODES[self._dtype], values)
+
+    @staticmethod
+    def _build(tree):
+        """Turn an array of point values into a fenwick tree, in place.
+
+        Complexity O(n).
+
+        Args:
+          tree: list/array of numbers, overwritten with the fenwick tree.
+
+        Return:
+          void
+        """
+        n = len(tree)
+        if numpy is not None and isinstance(tree, numpy.ndarray):
+            # Nodes with log2(step) trailing ones have their parent step
+            # positions to the right. Push one such level at a time.
+            step = 1
+            while step < n:
+                tree[2 * step - 1::2 * step] += tree[step - 1:n - step:2 * step]
+                step *= 2
+            return
+        for idx in range(n):
+            parent = idx | (idx + 1)
+            if parent < n:
+                tree[parent] += tree[idx]
 
     def add(self, idx, val):
         """Add val to element and index idx.
@@ -49,6 +309,13 @@ class Fenwick(object):
         Return:
           void
         """
+        if self._dtype == 'int64':
+            n = len(self._add)
+            if self._range_updates:
+                self._reserve((abs(left - 1) + abs(right) + 2 * n) * abs(val))
+            else:
+                # Both walks hit the same nodes, only their sum is val.
+                self._reserve(abs(val), n * abs(val))
         self._update(left, val, -(left - 1) * val)
         self._update(right, -val, right * val)
 
@@ -64,6 +331,10 @@ class Fenwick(object):
           void
         """
         n = len(self._mul)
+        if instrumentation.registry is not None:
+            instrumentation.registry.count(
+                'fenwick.update.nodes', Fenwick._update_length(idx, n),
+                instrumentation.call_site())
         while idx < n:
             self._mul[idx] += mul
             self._add[idx] += add
@@ -71,6 +342,219 @@ class Fenwick(object):
             #   idx += (idx & -idx)
             idx |= (idx + 1)
 
+    @staticmethod
+    def _update_length(idx, n):
+        """Count the nodes an update at idx visits.
+
+        Args:
+          idx: int, index of the update.
+          n: int, size of the tree.
+
+        Return:
+          int, number of nodes.
+        """
+        length = 0
+        while idx < n:
+            length += 1
+            idx |= (idx + 1)
+        return length
+
+    def add_many(self, indices, values):
+        """Add values[i] to the element at indices[i], for every i.
+
+        Large batches are applied in linear time: the deltas are collected
+        in a plain array, turned into a fenwick tree of their own and added
+        to this one node by node. This works because the tree is linear in
+        its input.
+
+        Complexity O(min(m*log(n), n + m)) for a batch of size m.
+
+        Args:
+          indices: sequence of int, indexes where values should be added.
+          values: sequence of numbers, same length as indices.
+
+        Return:
+          void
+        """
+        if self._dtype == 'int64':
+            self._reserve(Fenwick._abs_sum(values))
+        if self._is_large_batch(len(indices)):
+            self._update_many_linear(indices, None, values)
+        elif self._use_numpy:
+            self._update_many_vectorized(indices, None, values)
+        else:
+            for idx, val in zip(indices, values):
+                # A point update never changes the multiplicative part.
+                self._update(idx, 0, val)
+
+    def add_to_ranges(self, lefts, rights, values):
+        """Add values[i] to each element in [lefts[i], rights[i]].
+
+        Complexity O(min(m*log(n), n + m)) for a batch of size m.
+
+        Args:
+          lefts: sequence of int, left ends of the ranges, inclusive.
+          rights: sequence of int, right ends of the ranges, inclusive.
+          values: sequence of numbers, same length as lefts and rights.
+
+        Return:
+          void
+        """
+        if self._dtype == 'int64':
+            # Like add_to_range(), with indexes below n.
+            self._reserve(4 * len(self._add) * Fenwick._abs_sum(values))
+        if self._use_numpy:
+            lefts = numpy.asarray(lefts, dtype=numpy.int64)
+            rights = numpy.asarray(rights, dtype=numpy.int64)
+            values = numpy.asarray(values, dtype=self._dtype)
+            indices = numpy.concatenate((lefts, rights))
+            muls = numpy.concatenate((values, -values))
+            adds = numpy.concatenate((-(lefts - 1) * values, rights * values))
+        else:
+            indices = list(lefts) + list(rights)
+            muls = list(values) + [-val for val in values]
+            adds = ([-(left - 1) * val for left, val in zip(lefts, values)] +
+                    [right * val for right, val in zip(rights, values)])
+        if self._is_large_batch(len(indices)):
+            self._update_many_linear(indices, muls, adds)
+        elif self._use_numpy:
+            self._update_many_vectorized(indices, muls, adds)
+        else:
+            for idx, mul, add in zip(indices, muls, adds):
+                self._update(idx, mul, add)
+
+    def _is_large_batch(self, m):
+        """Whether a batch of m walks costs more than a linear pass.
+
+        Args:
+          m: int, number of walks in the batch.
+
+        Return:
+          bool, True if the linear time strategy should be used.
+        """
+        n = len(self._add)
+        return m * n.bit_length() > n
+
+    def _update_many_linear(self, indices, muls, adds):
+        """Apply many updates with a single linear pass over the tree.
+
+        Args:
+          indices: sequence of int, indexes of the updates.
+          muls: sequence of multiplicative values to add, or None.
+          adds: sequence of additive values to add.
+
+        Return:
+          void
+        """
+        n = len(self._add)
+        delta_add = self._point_deltas(n, indices, adds)
+        if muls is not None:
+            delta_mul = self._point_deltas(n, indices, muls)
+            if self._range_updates:
+                Fenwick._build(delta_mul)
+                self._add_tree(self._mul, delta_mul)
+            else:
+                # self._mul is an alias of self._add.
+                delta_add = self._point_deltas(n, indices, muls, delta_add)
+        Fenwick._build(delta_add)
+        self._add_tree(self._add, delta_add)
+
+    def _point_deltas(self, n, indices, values, deltas=None):
+        """Accumulate values at their indexes in a plain array.
+
+        Args:
+          n: int, length of the array.
+          indices: sequence of int, indexes of the values.
+          values: sequence of numbers.
+          deltas: array to accumulate into, a new one if None.
+
+        Return:
+          list or numpy array, the accumulated values.
+        """
+        if self._use_numpy:
+            if deltas is None:
+                deltas = numpy.zeros(n, dtype=self._dtype)
+            numpy.add.at(deltas, numpy.asarray(indices, dtype=numpy.int64),
+                         numpy.asarray(values, dtype=self._dtype))
+            return deltas
+        if deltas is None:
+            deltas = [0] * n
+        for idx, val in zip(indices, values):
+            deltas[idx] += val
+        return deltas
+
+    def merge(self, other):
+        """Add the elements of another tree to the elements of this one.
+
+        The tree is linear in its input, so adding the nodes of the two
+        trees gives the tree of the summed elements.
+
+        Complexity O(n).
+
+        Args:
+          other: Fenwick, same size and range_updates, any storage.
+
+        Raises:
+          ValueError, if the trees do not match.
+
+        Return:
+          void
+        """
+        if (len(other) != len(self) or
+                other.range_updates != self._range_updates):
+            raise ValueError('Can only merge trees of the same shape')
+        if self._dtype == 'int64':
+            self._reserve(other._node_magnitude())
+        self._add_tree(self._add, other._add)
+        if self._range_updates:
+            self._add_tree(self._mul, other._mul)
+
+    def _add_tree(self, tree, delta):
+        """Add the nodes of delta to the nodes of tree, in place.
+
+        Args:
+          tree: storage of this fenwick tree.
+          delta: nodes of another tree of the same size, any storage.
+
+        Return:
+          void
+        """
+        if self._use_numpy:
+            tree += delta
+            return
+        if numpy is not None and isinstance(delta, numpy.ndarray):
+            delta = delta.tolist()
+        for idx, val in enumerate(delta):
+            if val:
+                tree[idx] += val
+
+    def _update_many_vectorized(self, indices, muls, adds):
+        """Walk all updates up the tree together, one level per step.
+
+        Args:
+          indices: sequence of int, indexes of the updates.
+          muls: sequence of multiplicative values to add, or None.
+          adds: sequence of additive values to add.
+
+        Return:
+          void
+        """
+        n = len(self._add)
+        indices = numpy.array(indices, dtype=numpy.int64)
+        adds = numpy.asarray(adds, dtype=self._dtype)
+        if muls is not None:
+            muls = numpy.asarray(muls, dtype=self._dtype)
+        while len(indices):
+            live = indices < n
+            indices = indices[live]
+            adds = adds[live]
+            # numpy.add.at, unlike +=, handles repeated indexes.
+            numpy.add.at(self._add, indices, adds)
+            if muls is not None:
+                muls = muls[live]
+                numpy.add.at(self._mul, indices, muls)
+            indices |= indices + 1
+
     def sum(self, idx):
         """Compute the prefix sum up to an index.
 
@@ -83,6 +567,11 @@ class Fenwick(object):
         x = idx
         mul = 0
         add = 0
+        if instrumentation.registry is not None and idx >= 0:
+            # The walk drops one set bit of idx + 1 per node.
+            instrumentation.registry.count(
+                'fenwick.sum.nodes', bin(idx + 1).count('1'),
+                instrumentation.call_site())
         while idx >= 0:
             mul += self._mul[idx]
             add += self._add[idx]
@@ -94,3 +583,343 @@ class Fenwick(object):
         if self._range_updates:
             ret += mul * x
         return ret
+
+    def range_sum(self, left, right):
+        """Compute the sum of the elements in a range.
+
+        Walks down from right and from left - 1 together. The two walks
+        meet at a common node and from there on visit the same nodes, so
+        these cancel out and are skipped. With range updates the
+        multiplicative parts of the common nodes are still needed.
+
+        Complexity O(log(n)), short ranges visit only a few nodes.
+
+        Args:
+          left: int, index of left element of range, inclusive.
+          right: int, index of right element of range, inclusive.
+
+        Return:
+          number, the sum of the range.
+        """
+        hi = right
+        lo = left - 1
+        add = 0
+        mul_hi = 0
+        mul_lo = 0
+        while hi != lo:
+            if hi > lo:
+                add += self._add[hi]
+                if self._range_updates:
+                    mul_hi += self._mul[hi]
+                hi = (hi & (hi + 1)) - 1
+            else:
+                add -= self._add[lo]
+                if self._range_updates:
+                    mul_lo += self._mul[lo]
+                lo = (lo & (lo + 1)) - 1
+
+        ret = add
+        if self._range_updates:
+            common = 0
+            while hi >= 0:
+                common += self._mul[hi]
+                hi = (hi & (hi + 1)) - 1
+            ret += (mul_hi * right - mul_lo * (left - 1) +
+                    common * (right - left + 1))
+        return ret
+
+    def get(self, idx):
+        """Get the value of a single element.
+
+        Complexity O(log(n)). Without range updates only the children of
+        node idx are visited.
+
+        Args:
+          idx: int, index of the element.
+
+        Return:
+          number, the element at idx.
+        """
+        return self.range_sum(idx, idx)
+
+    def sum_many(self, indices):
+        """Compute the prefix sums up to many indexes.
+
+        Large batches compute all n prefix sums in a single linear pass and
+        look the answers up.
+
+        Complexity O(min(m*log(n), n + m)) for a batch of size m.
+
+        Args:
+          indices: sequence of int, indexes of last elements of prefix sums.
+
+        Return:
+          list of prefix sums, a numpy array for numpy storage.
+        """
+        if self._is_large_batch(len(indices)):
+            prefix_sums = self._prefix_sums()
+            # Negative indexes are empty prefixes, like in sum().
+            if self._use_numpy:
+                x = numpy.asarray(indices, dtype=numpy.int64)
+                return numpy.where(x >= 0, prefix_sums[numpy.maximum(x, 0)],
+                                   0)
+            return [prefix_sums[idx] if idx >= 0 else 0 for idx in indices]
+        if not self._use_numpy:
+            return [self.sum(idx) for idx in indices]
+
+        x = numpy.array(indices, dtype=numpy.int64)
+        add = numpy.zeros(len(x), dtype=self._dtype)
+        mul = numpy.zeros(len(x), dtype=self._dtype)
+        idx = x.copy()
+        live = idx >= 0
+        while live.any():
+            add[live] += self._add[idx[live]]
+            if self._range_updates:
+                mul[live] += self._mul[idx[live]]
+            idx[live] = (idx[live] & (idx[live] + 1)) - 1
+            live = idx >= 0
+        if self._range_updates:
+            add += mul * x
+        return add
+
+    def lower_bound(self, prefix_sum):
+        """Find the first index whose prefix sum is at least prefix_sum.
+
+        The prefix sums must be non-decreasing, for example when all elements
+        are non-negative. Walks down the implicit tree once, so it is a
+        binary search where every probe costs O(1).
+
+        Complexity O(log(n)).
+
+        Args:
+          prefix_sum: number, the prefix sum we are looking for.
+
+        Return:
+          int, the smallest idx with sum(idx) >= prefix_sum, n if none.
+        """
+        n = len(self._add)
+        pos = 0
+        add = 0
+        mul = 0
+        step = 1 << n.bit_length() >> 1
+        while step:
+            nxt = pos + step
+            if nxt <= n:
+                # The nodes picked so far plus node nxt - 1 are exactly the
+                # nodes sum(nxt - 1) would visit.
+                idx = nxt - 1
+                next_add = add + self._add[idx]
+                if self._range_updates:
+                    next_mul = mul + self._mul[idx]
+                    if next_add + next_mul * idx < prefix_sum:
+                        pos, add, mul = nxt, next_add, next_mul
+                elif next_add < prefix_sum:
+                    pos, add = nxt, next_add
+            step >>= 1
+        return pos
+
+    def select(self, k):
+        """Find the index holding the k-th unit, counting from 0.
+
+        With elements that are counts, this is the k-th element of the
+        multiset the tree represents.
+
+        Complexity O(log(n)).
+
+        Args:
+          k: int, non-negative.
+
+        Return:
+          int, the smallest idx with sum(idx) > k, n if none.
+        """
+        return self.lower_bound(k + 1)
+
+    def _prefix_sums(self):
+        """Compute all prefix sums in linear time.
+
+        Return:
+          list of prefix sums, a numpy array for numpy storage.
+        """
+        add = Fenwick._accumulate(self._unbuild(self._add))
+        if not self._range_updates:
+            return add
+        mul = Fenwick._accumulate(self._unbuild(self._mul))
+        if self._use_numpy:
+            return add + mul * numpy.arange(len(mul))
+        return [a + m * x for x, (a, m) in enumerate(zip(add, mul))]
+
+    def _unbuild(self, tree):
+        """Recover the point values from a fenwick tree.
+
+        The inverse of _build(). Complexity O(n).
+
+        Args:
+          tree: storage of this fenwick tree, left unchanged.
+
+        Return:
+          list or numpy array, the point values.
+        """
+        n = len(tree)
+        if self._use_numpy:
+            values = tree.copy()
+            step = 1
+            while 2 * step < n:
+                step *= 2
+            while step >= 1:
+                values[2 * step - 1::2 * step] -= (
+                    values[step - 1:n - step:2 * step])
+                step //= 2
+            return values
+        values = list(tree)
+        for idx in range(n - 1, -1, -1):
+            parent = idx | (idx + 1)
+            if parent < n:
+                values[parent] -= values[idx]
+        return values
+
+    @staticmethod
+    def _accumulate(values):
+        """Running sums of values.
+
+        Args:
+          values: list or numpy array of numbers.
+
+        Return:
+          list or numpy array, the running sums.
+        """
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            return numpy.cumsum(values)
+        return list(itertools.accumulate(values))
+
+    def save(self, path):
+        """Save the tree to a file that open() can memory-map.
+
+        Layout, all little-endian:
+          24 byte header: 8 bytes magic b'FENWICK1', 1 byte range_updates,
+            1 byte dtype (0 for int64, 1 for float64), 6 bytes padding,
+            8 bytes unsigned n.
+          n 8 byte numbers: the additive tree.
+          n 8 byte numbers: the multiplicative tree, only if range_updates.
+
+        Trees with list storage are saved as int64, or float64 if they hold
+        floats. Numbers that do not fit raise OverflowError.
+
+        Args:
+          path: str, the file to write.
+
+        Return:
+          void
+        """
+        dtype = self._dtype
+        if dtype is None:
+            floats = any(isinstance(e, float) for e in self._add)
+            if self._range_updates:
+                floats = floats or any(isinstance(e, float) for e in self._mul)
+            dtype = 'float64' if floats else 'int64'
+        trees = [self._add]
+        if self._range_updates:
+            trees.append(self._mul)
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self._range_updates,
+                                 _DTYPE_CODES[dtype], len(self._add)))
+            for tree in trees:
+                if numpy is not None and isinstance(tree, numpy.ndarray):
+                    f.write(tree.astype(_SAVED_DTYPES[dtype]).tobytes())
+                    continue
+                buf = array.array(_TYPECODES[dtype], tree)
+                if sys.byteorder == 'big':
+                    buf.byteswap()
+                f.write(buf.tobytes())
+
+    @classmethod
+    def open(cls, path, mode='r', use_numpy=False):
+        """Memory-map a tree written by save().
+
+        Queries read the mapped file directly, nothing is deserialized. With
+        mode 'r' many processes can share one copy of the tree through the
+        page cache.
+
+        Args:
+          path: str, the file to map.
+          mode: str, 'r' read-only, updates fail. 'r+' updates are written
+            through to the file. 'c' updates stay in memory (copy-on-write).
+          use_numpy: bool, view the mapped file as numpy arrays.
+
+        Raises:
+          ValueError, if the file is not a saved tree.
+
+        Return:
+          Fenwick, the mapped tree.
+        """
+        if mode not in _ACCESS:
+            raise ValueError('Unsupported mode: %r' % (mode,))
+        if use_numpy and numpy is None:
+            raise ImportError('use_numpy needs numpy')
+        if sys.byteorder == 'big':
+            raise ValueError('Mapping saved trees needs a little-endian host')
+        with open(path, 'r+b' if mode == 'r+' else 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=_ACCESS[mode])
+        if len(buf) < _HEADER.size:
+            buf.close()
+            raise ValueError('Not a saved fenwick tree: %s' % path)
+        magic, range_updates, code, n = _HEADER.unpack_from(buf)
+        dtypes = {v: k for k, v in _DTYPE_CODES.items()}
+        parts = 2 if range_updates else 1
+        if (magic != _MAGIC or code not in dtypes or
+                len(buf) != _HEADER.size + parts * 8 * n):
+            buf.close()
+            raise ValueError('Not a saved fenwick tree: %s' % path)
+
+        tree = cls.__new__(cls)
+        tree._range_updates = range_updates
+        tree._requested_dtype = dtypes[code]
+        tree._dtype = dtypes[code]
+        tree._magnitude = None
+        tree._requested_use_numpy = use_numpy
+        tree._use_numpy = use_numpy
+        tree._mmap = buf
+        views = []
+        for i in range(parts):
+            offset = _HEADER.size + i * 8 * n
+            if use_numpy:
+                views.append(numpy.frombuffer(
+                    buf, dtype=_SAVED_DTYPES[tree._dtype], count=n,
+                    offset=offset))
+            else:
+                views.append(memoryview(buf)[offset:offset + 8 * n].cast(
+                    _TYPECODES[tree._dtype]))
+        tree._add = views[0]
+        # Without range updates self._mul is an alias of self._add.
+        tree._mul = views[-1]
+        return tree
+
+    def flush(self):
+        """Write updates of a tree opened with mode 'r+' to disk.
+
+        Return:
+          void
+        """
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self):
+        """Unmap a tree returned by open(). The tree is unusable after.
+
+        Numpy views of the map still held by the caller keep it alive. It is
+        then unmapped once they are collected instead.
+
+        Return:
+          void
+        """
+        if self._mmap is None:
+            return
+        if isinstance(self._add, memoryview):
+            self._add.release()
+            self._mul.release()
+        # Numpy views release the map once they are collected.
+        self._add = self._mul = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._mmap = None
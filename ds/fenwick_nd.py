@@ -0,0 +1,213 @@
+"""Multi-dimensional fenwick tree with range updates.
+
+The 1-D tree in algorithms.ds.fenwick splits a range update into two point
+updates, each with a multiplicative and an additive part. A box update in d
+dimensions is the product of d such range updates: 2^d corner updates, each
+with 2^d parts, one for every subset of dimensions that is multiplied out.
+Every part is kept in its own flat row-major tree.
+"""
+
+
+class FenwickND(object):
+
+    def __init__(self, shape, values=None, range_updates=True):
+        """Initialize the tree.
+
+        Complexity O(d*N) for N = prod(shape) elements.
+
+        Args:
+          shape: list/tuple of int, size of every dimension.
+          values: list/tuple of numbers in row-major order, N of them.
+            All zeros if None.
+          range_updates: bool, whether box updates are supported.
+
+        Return:
+          void
+        """
+        self._shape = tuple(shape)
+        self._range_updates = range_updates
+        self._strides = []
+        stride = 1
+        for n in reversed(self._shape):
+            self._strides.append(stride)
+            stride *= n
+        self._strides.reverse()
+        self._size = stride
+        parts = 1 << len(self._shape) if range_updates else 1
+        self._trees = [[0] * self._size for _ in range(parts)]
+        if values is not None:
+            self.rebuild(values)
+
+    @property
+    def shape(self):
+        """The size of every dimension.
+        """
+        return self._shape
+
+    def rebuild(self, values):
+        """Replace the contents of the tree.
+
+        Complexity O(d*N). The 1-D linear build is run along every axis.
+
+        Args:
+          values: list/tuple of numbers in row-major order.
+
+        Return:
+          void
+        """
+        if len(values) != self._size:
+            raise ValueError('Expected %d values, got %d' %
+                             (self._size, len(values)))
+        tree = list(values)
+        for n, stride in zip(self._shape, self._strides):
+            for offset in range(self._size):
+                idx = (offset // stride) % n
+                parent = idx | (idx + 1)
+                if parent < n:
+                    tree[offset + (parent - idx) * stride] += tree[offset]
+        # Point values only have an additive part.
+        self._trees[0] = tree
+        for i in range(1, len(self._trees)):
+            self._trees[i] = [0] * self._size
+
+    def add(self, point, val):
+        """Add val to the element at point.
+
+        Complexity O(prod(log(n_i))).
+
+        Args:
+          point: list/tuple of int, one index per dimension.
+          val: number, value to add.
+
+        Return:
+          void
+        """
+        parts = [0] * len(self._trees)
+        parts[0] = val
+        self._update(point, parts)
+
+    def add_to_range(self, lo, hi, val):
+        """Add val to every element of the box [lo, hi].
+
+        Complexity O(4^d * prod(log(n_i))).
+
+        Args:
+          lo: list/tuple of int, lowest corner of the box, inclusive.
+          hi: list/tuple of int, highest corner of the box, inclusive.
+          val: number, value to add.
+
+        Return:
+          void
+        """
+        if not self._range_updates:
+            raise ValueError('add_to_range needs range_updates')
+        d = len(self._shape)
+        for corner in range(1 << d):
+            # Bit i of corner says if dimension i uses the right end.
+            point = []
+            pairs = []
+            for i in range(d):
+                if corner >> i & 1:
+                    point.append(hi[i])
+                    pairs.append((-1, hi[i]))
+                else:
+                    point.append(lo[i])
+                    pairs.append((1, -(lo[i] - 1)))
+            parts = []
+            for subset in range(1 << d):
+                part = val
+                for i, (mul, add) in enumerate(pairs):
+                    part *= mul if subset >> i & 1 else add
+                parts.append(part)
+            self._update(point, parts)
+
+    def _offsets(self, point, up):
+        """Flat offsets of the nodes a walk from point visits.
+
+        Args:
+          point: list/tuple of int, one index per dimension.
+          up: bool, walk towards the root (update) or down (query).
+
+        Return:
+          list of int, offsets into the flat trees.
+        """
+        offsets = [0]
+        for idx, n, stride in zip(point, self._shape, self._strides):
+            chain = []
+            if up:
+                while idx < n:
+                    chain.append(idx * stride)
+                    idx |= (idx + 1)
+            else:
+                while idx >= 0:
+                    chain.append(idx * stride)
+                    idx = (idx & (idx + 1)) - 1
+            offsets = [offset + step for offset in offsets for step in chain]
+        return offsets
+
+    def _update(self, point, parts):
+        """Update of the internal structures of the fenwick tree.
+
+        Args:
+          point: list/tuple of int, one index per dimension.
+          parts: list of numbers, value to add to each of the trees.
+
+        Return:
+          void
+        """
+        offsets = self._offsets(point, up=True)
+        for tree, part in zip(self._trees, parts):
+            if part:
+                for offset in offsets:
+                    tree[offset] += part
+
+    def sum(self, point):
+        """Compute the sum of the box from the origin to point.
+
+        Complexity O(2^d * prod(log(n_i))).
+
+        Args:
+          point: list/tuple of int, highest corner of the box, inclusive.
+
+        Return:
+          number, the prefix sum.
+        """
+        offsets = self._offsets(point, up=False)
+        ret = 0
+        for subset, tree in enumerate(self._trees):
+            total = 0
+            for offset in offsets:
+                total += tree[offset]
+            if total:
+                for i, x in enumerate(point):
+                    if subset >> i & 1:
+                        total *= x
+                ret += total
+        return ret
+
+    def range_sum(self, lo, hi):
+        """Compute the sum of the box [lo, hi].
+
+        Inclusion-exclusion over the 2^d prefix boxes.
+
+        Complexity O(4^d * prod(log(n_i))).
+
+        Args:
+          lo: list/tuple of int, lowest corner of the box, inclusive.
+          hi: list/tuple of int, highest corner of the box, inclusive.
+
+        Return:
+          number, the sum of the box.
+        """
+        d = len(self._shape)
+        ret = 0
+        for corner in range(1 << d):
+            # Bit i of corner says if dimension i is cut off below lo[i].
+            point = [lo[i] - 1 if corner >> i & 1 else hi[i] for i in range(d)]
+            if min(point) < 0:
+                continue
+            if bin(corner).count('1') % 2:
+                ret -= self.sum(point)
+            else:
+                ret += self.sum(point)
+        return ret
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+import itertools
+import random
+import unittest
+
+from fenwick_nd import FenwickND
+
+
+class FenwickNDTest(unittest.TestCase):
+
+    def brute_sum(self, grid, shape, lo, hi):
+        total = 0
+        for point in itertools.product(*[range(l, h + 1)
+                                         for l, h in zip(lo, hi)]):
+            total += grid[self.offset(shape, point)]
+        return total
+
+    def offset(self, shape, point):
+        offset = 0
+        for n, x in zip(shape, point):
+            offset = offset * n + x
+        return offset
+
+    def random_box(self, rng, shape):
+        lo = [rng.randrange(n) for n in shape]
+        hi = [rng.randrange(l, n) for l, n in zip(lo, shape)]
+        return lo, hi
+
+    def test_2d(self):
+        grid = [1, 2, 3,
+                4, 5, 6]
+        tree = FenwickND((2, 3), grid)
+        self.assertEqual((2, 3), tree.shape)
+        self.assertEqual(1, tree.sum((0, 0)))
+        self.assertEqual(6, tree.sum((0, 2)))
+        self.assertEqual(12, tree.sum((1, 1)))
+        self.assertEqual(21, tree.sum((1, 2)))
+        self.assertEqual(11, tree.range_sum((1, 1), (1, 2)))
+
+        tree.add((1, 1), 10)
+        self.assertEqual(22, tree.sum((1, 1)))
+        tree.add_to_range((0, 1), (1, 2), 2)
+        self.assertEqual(26, tree.sum((1, 1)))
+        self.assertEqual(39, tree.sum((1, 2)))
+        self.assertEqual(13, tree.range_sum((0, 2), (1, 2)))
+
+    def test_random_boxes(self):
+        rng = random.Random(9)
+        for shape in ((7,), (5, 6), (3, 4, 5)):
+            size = 1
+            for n in shape:
+                size *= n
+            grid = [rng.randint(-5, 5) for _ in range(size)]
+            tree = FenwickND(shape, grid)
+            point_tree = FenwickND(shape, grid, range_updates=False)
+            # Only the point updates go to point_tree.
+            point_grid = list(grid)
+            for _ in range(20):
+                lo, hi = self.random_box(rng, shape)
+                val = rng.randint(-5, 5)
+                tree.add_to_range(lo, hi, val)
+                for point in itertools.product(*[range(l, h + 1)
+                                                 for l, h in zip(lo, hi)]):
+                    grid[self.offset(shape, point)] += val
+                point = [rng.randrange(n) for n in shape]
+                val = rng.randint(-5, 5)
+                tree.add(point, val)
+                point_tree.add(point, val)
+                grid[self.offset(shape, point)] += val
+                point_grid[self.offset(shape, point)] += val
+
+                lo, hi = self.random_box(rng, shape)
+                self.assertEqual(self.brute_sum(grid, shape, lo, hi),
+                                 tree.range_sum(lo, hi))
+                self.assertEqual(
+                    self.brute_sum(grid, shape, [0] * len(shape), hi),
+                    tree.sum(hi))
+                self.assertEqual(self.brute_sum(point_grid, shape, lo, hi),
+                                 point_tree.range_sum(lo, hi))
+                self.assertEqual(
+                    self.brute_sum(point_grid, shape, [0] * len(shape), hi),
+                    point_tree.sum(hi))
+            with self.assertRaises(ValueError):
+                point_tree.add_to_range(lo, hi, 1)
+
+    def test_bad_values(self):
+        with self.assertRaises(ValueError):
+            FenwickND((2, 2), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
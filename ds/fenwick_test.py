@@ -1,9 +1,19 @@
 #!/usr/bin/env python
 
+import array
+import os
+import random
+import shutil
+import tempfile
 import unittest
 
 from fenwick import Fenwick
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class FenwickTest(unittest.TestCase):
 
@@ -41,6 +51,316 @@ class FenwickTest(unittest.TestCase):
         self.assertEqual(13, range_tree.sum(2))
         self.assertEqual(12, range_tree.sum(3))
 
+    def test_linear_build(self):
+        """Linear time construction matches one add() per element.
+        """
+        l = [5, -2, 7, 0, 3, 3, -8, 1, 4, 9, -6]
+        for range_updates in (False, True):
+            tree = Fenwick([0] * len(l), range_updates=range_updates)
+            for i, e in enumerate(l):
+                tree.add(i, e)
+            built = Fenwick(l, range_updates=range_updates)
+            for i in range(len(l)):
+                self.assertEqual(sum(l[:i + 1]), built.sum(i))
+                self.assertEqual(tree.sum(i), built.sum(i))
+
+    def test_from_iterable(self):
+        tree = Fenwick.from_iterable(iter(range(5)), range_updates=False)
+        self.assertEqual([0, 1, 3, 6, 10], [tree.sum(i) for i in range(5)])
+        range_tree = Fenwick.from_iterable(x for x in range(5))
+        range_tree.add_to_range(1, 3, 2)
+        self.assertEqual([0, 3, 7, 12, 16],
+                         [range_tree.sum(i) for i in range(5)])
+
+    def test_rebuild(self):
+        for range_updates in (False, True):
+            tree = Fenwick([1, 2, 3], range_updates=range_updates)
+            tree.add(0, 10)
+            tree.rebuild([4, 0, 1, 2])
+            self.assertEqual([4, 4, 5, 7], [tree.sum(i) for i in range(4)])
+            tree.add(1, 1)
+            self.assertEqual([4, 5, 6, 8], [tree.sum(i) for i in range(4)])
+
+    def check_prefix_sums(self, expected, tree):
+        self.assertEqual(expected, [tree.sum(i) for i in range(len(expected))])
+
+    def test_typed_storage(self):
+        l = [3, 1, 2, -1, 7, 0, 5]
+        for range_updates in (False, True):
+            tree = Fenwick(l, range_updates=range_updates, dtype='int64')
+            self.assertEqual('int64', tree.dtype)
+            self.assertIsInstance(tree._add, array.array)
+            self.assertEqual('q', tree._add.typecode)
+            self.check_prefix_sums([3, 4, 6, 5, 12, 12, 17], tree)
+            tree.add(2, 4)
+            self.check_prefix_sums([3, 4, 10, 9, 16, 16, 21], tree)
+
+        tree = Fenwick([0.5, 0.25, 1.0], dtype='float64')
+        self.assertEqual('d', tree._add.typecode)
+        tree.add_to_range(0, 2, 0.5)
+        self.check_prefix_sums([1.0, 1.75, 3.25], tree)
+
+    def test_typed_storage_overflow_fallback(self):
+        l = [2**62, 2**62]
+        tree = Fenwick(l, range_updates=False, dtype='int64')
+        self.assertIsNone(tree.dtype)
+        self.assertIsInstance(tree._add, list)
+        self.check_prefix_sums([2**62, 2**63], tree)
+
+        # Range updates multiply by indexes, so the bound is tighter.
+        l = [2**62, 1, 1]
+        self.assertEqual(
+            'int64', Fenwick(l, range_updates=False, dtype='int64').dtype)
+        self.assertIsNone(Fenwick(l, range_updates=True, dtype='int64').dtype)
+
+        tree = Fenwick([0, 0], range_updates=False, dtype='int64')
+        tree.add(0, 2**63)
+        self.assertIsNone(tree.dtype)
+        self.check_prefix_sums([2**63, 2**63], tree)
+
+    def test_update_overflow_fallback(self):
+        """Updates that could overflow move a built tree to lists first.
+        """
+        for options in self.storage_options()[1:]:
+            tree = Fenwick([0] * 4, **options)
+            tree.add_to_range(1, 2, 2**62)
+            self.assertIsNone(tree.dtype)
+            self.assertIsInstance(tree._add, list)
+            self.check_prefix_sums([0, 2**62, 2**63, 2**63], tree)
+
+            l = [3, -1, 4, 1, -5, 9, 2, -6]
+            updates = [(0, 2**40), (3, -2**61), (3, 2**61), (6, 2**62)]
+            for batch in (False, True):
+                expected = Fenwick(l, range_updates=False)
+                tree = Fenwick(l, range_updates=False, **options)
+                self.assertEqual('int64', tree.dtype)
+                if batch:
+                    tree.add_many(*zip(*updates))
+                else:
+                    for idx, val in updates:
+                        tree.add(idx, val)
+                for idx, val in updates:
+                    expected.add(idx, val)
+                self.assertIsNone(tree.dtype)
+                self.check_prefix_sums(
+                    [expected.sum(i) for i in range(len(l))], tree)
+
+            tree = Fenwick([1, 2, 3], **options)
+            tree.add_to_ranges([0, 1], [2, 2], [2**61, 5])
+            self.assertIsNone(tree.dtype)
+            self.check_prefix_sums([2**61 + 1, 2**62 + 8, 3 * 2**61 + 16],
+                                   tree)
+
+            tree = Fenwick([1, 2], range_updates=False, **options)
+            tree.merge(Fenwick([2**63, 0], range_updates=False))
+            self.assertIsNone(tree.dtype)
+            self.check_prefix_sums([2**63 + 1, 2**63 + 3], tree)
+
+            # Small updates keep the typed storage.
+            tree = Fenwick([1, 2], **options)
+            tree.add_to_range(0, 1, 10)
+            self.assertEqual('int64', tree.dtype)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy_overflow_fallback(self):
+        tree = Fenwick([2**62, 2**62], range_updates=False, dtype='int64',
+                       use_numpy=True)
+        self.assertIsNone(tree.dtype)
+        self.assertIsInstance(tree._add, list)
+        # Batches and merges take the list paths.
+        tree.add_many([0], [1])
+        tree.add_many([0] * 10, [1] * 10)
+        tree.merge(Fenwick([1, 2], range_updates=False))
+        self.assertEqual([2**62 + 12, 2**63 + 14], tree.sum_many([0, 1]))
+        self.check_prefix_sums([2**62 + 12, 2**63 + 14], tree)
+
+        # Small values go back to numpy storage.
+        tree.rebuild([1, 2])
+        self.assertEqual('int64', tree.dtype)
+        self.assertIsInstance(tree._add, numpy.ndarray)
+        self.assertEqual([1, 3], tree.sum_many([0, 1]).tolist())
+
+    def test_bad_dtype(self):
+        with self.assertRaises(ValueError):
+            Fenwick([1, 2], dtype='int8')
+        with self.assertRaises(ValueError):
+            Fenwick([1, 2], use_numpy=True)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy_storage(self):
+        l = list(range(-20, 37, 3))
+        for range_updates in (False, True):
+            tree = Fenwick(l, range_updates=range_updates, dtype='int64',
+                           use_numpy=True)
+            self.assertIsInstance(tree._add, numpy.ndarray)
+            self.assertEqual(numpy.int64, tree._add.dtype)
+            expected = Fenwick(l, range_updates=range_updates)
+            self.assertEqual(expected._add, tree._add.tolist())
+            tree.add(5, 11)
+            expected.add(5, 11)
+            self.check_prefix_sums(
+                [expected.sum(i) for i in range(len(l))], tree)
+
+    def storage_options(self):
+        options = [{}, {'dtype': 'int64'}]
+        if numpy is not None:
+            options.append({'dtype': 'int64', 'use_numpy': True})
+        return options
+
+    def test_batches(self):
+        """Batched calls match one call per element, small and large.
+        """
+        rng = random.Random(7)
+        n = 50
+        l = [rng.randint(-10, 10) for _ in range(n)]
+        for m in (3, 200):
+            indices = [rng.randrange(n) for _ in range(m)]
+            values = [rng.randint(-10, 10) for _ in range(m)]
+            lefts = [rng.randrange(n) for _ in range(m)]
+            rights = [rng.randrange(left, n) for left in lefts]
+            for range_updates in (False, True):
+                expected = Fenwick(l, range_updates=range_updates)
+                for idx, val in zip(indices, values):
+                    expected.add(idx, val)
+                if range_updates:
+                    for left, right, val in zip(lefts, rights, values):
+                        expected.add_to_range(left, right, val)
+                expected_sums = [expected.sum(idx) for idx in indices]
+                for options in self.storage_options():
+                    tree = Fenwick(l, range_updates=range_updates, **options)
+                    tree.add_many(indices, values)
+                    if range_updates:
+                        tree.add_to_ranges(lefts, rights, values)
+                    self.assertEqual(expected_sums,
+                                     list(tree.sum_many(indices)))
+
+    def test_sum_many_negative(self):
+        """Negative indexes are empty prefixes whatever the batch size.
+        """
+        for options in self.storage_options():
+            tree = Fenwick(range(1, 9), **options)
+            for m in (1, 20):
+                self.assertEqual([0] * m + [10],
+                                 list(tree.sum_many([-1] * m + [3])))
+            self.assertEqual([0, 36], list(tree.sum_many([-5, 7])))
+
+    def test_range_sum_and_get(self):
+        rng = random.Random(13)
+        n = 37
+        l = [rng.randint(-9, 9) for _ in range(n)]
+        for range_updates in (False, True):
+            tree = Fenwick(l, range_updates=range_updates)
+            values = list(l)
+            if range_updates:
+                for _ in range(10):
+                    left = rng.randrange(n)
+                    right = rng.randrange(left, n)
+                    val = rng.randint(-9, 9)
+                    tree.add_to_range(left, right, val)
+                    for i in range(left, right + 1):
+                        values[i] += val
+            for left in range(n):
+                self.assertEqual(values[left], tree.get(left))
+                for right in range(left, n):
+                    self.assertEqual(sum(values[left:right + 1]),
+                                     tree.range_sum(left, right))
+
+    def test_lower_bound(self):
+        rng = random.Random(11)
+        for n in (0, 1, 2, 7, 8, 9, 33):
+            l = [rng.randint(0, 3) for _ in range(n)]
+            prefix_sums = [sum(l[:i + 1]) for i in range(n)]
+            for range_updates in (False, True):
+                tree = Fenwick(l, range_updates=range_updates)
+                for target in range(-1, sum(l) + 2):
+                    expected = next(
+                        (i for i, p in enumerate(prefix_sums) if p >= target),
+                        n)
+                    self.assertEqual(expected, tree.lower_bound(target))
+
+        range_tree = Fenwick([0] * 6)
+        range_tree.add_to_range(1, 4, 2)
+        self.assertEqual(1, range_tree.lower_bound(1))
+        self.assertEqual(2, range_tree.lower_bound(3))
+        self.assertEqual(4, range_tree.lower_bound(8))
+        self.assertEqual(6, range_tree.lower_bound(9))
+
+    def test_select(self):
+        tree = Fenwick([1, 0, 2, 0, 1], range_updates=False)
+        self.assertEqual([0, 2, 2, 4, 5], [tree.select(k) for k in range(5)])
+        tree.add(2, -1)
+        self.assertEqual([0, 2, 4, 5], [tree.select(k) for k in range(4)])
+
+    def test_save_open(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        l = [3, 1, 2, -1, 7, 0, 5]
+        options = [False]
+        if numpy is not None:
+            options.append(True)
+        for range_updates in (False, True):
+            path = os.path.join(tmpdir, 'tree%d' % range_updates)
+            tree = Fenwick(l, range_updates=range_updates)
+            tree.add_to_range(2, 4, 1)
+            expected = [tree.sum(i) for i in range(len(l))]
+            tree.save(path)
+            for use_numpy in options:
+                mapped = Fenwick.open(path, use_numpy=use_numpy)
+                self.check_prefix_sums(expected, mapped)
+                self.assertEqual(expected[-1], mapped.range_sum(0, 6))
+                with self.assertRaises((TypeError, ValueError)):
+                    mapped.add(0, 1)
+                mapped.close()
+
+                # Copy-on-write updates do not reach the file.
+                mapped = Fenwick.open(path, mode='c', use_numpy=use_numpy)
+                mapped.add(0, 10)
+                self.assertEqual(expected[0] + 10, mapped.sum(0))
+                mapped.close()
+                mapped = Fenwick.open(path, use_numpy=use_numpy)
+                self.assertEqual(expected[0], mapped.sum(0))
+                mapped.close()
+
+            # Write-through updates do.
+            mapped = Fenwick.open(path, mode='r+')
+            mapped.add(1, 10)
+            mapped.flush()
+            mapped.close()
+            mapped = Fenwick.open(path)
+            self.check_prefix_sums(expected[:1] + [e + 10 for e in expected[1:]],
+                                   mapped)
+            mapped.close()
+
+            # A mapped tree cannot move to lists, nothing is written.
+            mapped = Fenwick.open(path, mode='r+')
+            with self.assertRaises(OverflowError):
+                mapped.add_to_range(1, 3, 2**62)
+            self.assertEqual('int64', mapped.dtype)
+            self.check_prefix_sums(expected[:1] + [e + 10 for e in expected[1:]],
+                                   mapped)
+            mapped.close()
+
+        if numpy is not None:
+            # A view that outlives the tree keeps the map alive.
+            mapped = Fenwick.open(path, use_numpy=True)
+            nodes = mapped._add
+            mapped.close()
+            self.assertEqual(len(l), len(nodes.tolist()))
+            del nodes
+
+        path = os.path.join(tmpdir, 'float')
+        Fenwick([0.5, 1.5], dtype='float64').save(path)
+        mapped = Fenwick.open(path)
+        self.assertEqual('float64', mapped.dtype)
+        self.check_prefix_sums([0.5, 2.0], mapped)
+        mapped.close()
+
+        path = os.path.join(tmpdir, 'garbage')
+        with open(path, 'wb') as f:
+            f.write(b'not a fenwick tree at all')
+        with self.assertRaises(ValueError):
+            Fenwick.open(path)
+
     def count_inversions(self, arr):
         """Count the number of inversions in arr.
 
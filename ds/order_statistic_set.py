@@ -0,0 +1,147 @@
+"""Set of integers from a bounded universe with rank and select queries.
+
+The set is kept as a fenwick tree of 0/1 counts over the universe.
+"""
+
+from algorithms.ds.fenwick import Fenwick
+
+
+class OrderStatisticSet(object):
+
+    def __init__(self, universe, items=(), dtype=None, use_numpy=False):
+        """Initialize the set.
+
+        Complexity O(n + m) for a universe of size n and m items.
+
+        Args:
+          universe: int, elements of the set are in [0, universe).
+          items: iterable of int, initial elements of the set.
+          dtype: None, 'int64' or 'float64', storage of the fenwick tree.
+          use_numpy: bool, store the fenwick tree in numpy arrays.
+
+        Return:
+          void
+        """
+        self._present = bytearray(universe)
+        for x in items:
+            self._present[x] = 1
+        self._len = sum(self._present)
+        self._counts = Fenwick(list(self._present), range_updates=False,
+                               dtype=dtype, use_numpy=use_numpy)
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, x):
+        return 0 <= x < len(self._present) and self._present[x] == 1
+
+    def __iter__(self):
+        """Iterate over the elements in increasing order.
+        """
+        for x, present in enumerate(self._present):
+            if present:
+                yield x
+
+    def insert(self, x):
+        """Insert an element, no-op if it is already present.
+
+        Complexity O(log(n)).
+
+        Args:
+          x: int, in [0, universe).
+
+        Return:
+          void
+        """
+        if not self._present[x]:
+            self._present[x] = 1
+            self._len += 1
+            self._counts.add(x, 1)
+
+    def remove(self, x):
+        """Remove an element.
+
+        Complexity O(log(n)).
+
+        Args:
+          x: int, in [0, universe).
+
+        Raises:
+          KeyError, if x is not in the set.
+
+        Return:
+          void
+        """
+        if x not in self:
+            raise KeyError(x)
+        self._present[x] = 0
+        self._len -= 1
+        self._counts.add(x, -1)
+
+    def update(self, items):
+        """Insert many elements.
+
+        Complexity O(min(m*log(n), n + m)) for m items.
+
+        Args:
+          items: iterable of int, in [0, universe).
+
+        Return:
+          void
+        """
+        new = []
+        for x in items:
+            if not self._present[x]:
+                self._present[x] = 1
+                new.append(x)
+        self._len += len(new)
+        self._counts.add_many(new, [1] * len(new))
+
+    def rank(self, x):
+        """Count the elements smaller than x.
+
+        Complexity O(log(n)).
+
+        Args:
+          x: int.
+
+        Return:
+          int, the number of elements smaller than x.
+        """
+        x = min(x, len(self._present))
+        if x <= 0:
+            return 0
+        return int(self._counts.sum(x - 1))
+
+    def rank_many(self, xs):
+        """Count the elements smaller than each of xs.
+
+        Complexity O(min(m*log(n), n + m)) for m queries.
+
+        Args:
+          xs: sequence of int.
+
+        Return:
+          list of int, the ranks.
+        """
+        n = len(self._present)
+        return [int(s) for s in
+                self._counts.sum_many([min(x, n) - 1 for x in xs])]
+
+    def select(self, i):
+        """Find the i-th smallest element, counting from 0.
+
+        Complexity O(log(n)).
+
+        Args:
+          i: int, in [0, len(self)).
+
+        Raises:
+          IndexError, if i is out of range.
+
+        Return:
+          int, the element with rank i.
+        """
+        if not 0 <= i < self._len:
+            raise IndexError('select index out of range')
+        return self._counts.select(i)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+import random
+import unittest
+
+from order_statistic_set import OrderStatisticSet
+
+
+class OrderStatisticSetTest(unittest.TestCase):
+
+    def test_insert_remove(self):
+        s = OrderStatisticSet(10)
+        self.assertEqual(0, len(s))
+        s.insert(7)
+        s.insert(2)
+        s.insert(7)
+        s.insert(4)
+        self.assertEqual(3, len(s))
+        self.assertIn(4, s)
+        self.assertNotIn(5, s)
+        self.assertNotIn(10, s)
+        self.assertEqual([2, 4, 7], list(s))
+
+        s.remove(4)
+        self.assertEqual([2, 7], list(s))
+        with self.assertRaises(KeyError):
+            s.remove(4)
+
+    def test_rank_select(self):
+        s = OrderStatisticSet(10, [8, 1, 5, 3])
+        self.assertEqual([0, 0, 1, 1, 2, 2, 3, 3, 3, 4, 4],
+                         [s.rank(x) for x in range(11)])
+        self.assertEqual(0, s.rank(-3))
+        self.assertEqual(4, s.rank(100))
+        self.assertEqual([1, 3, 5, 8], [s.select(i) for i in range(4)])
+        with self.assertRaises(IndexError):
+            s.select(4)
+        with self.assertRaises(IndexError):
+            s.select(-1)
+
+        s.remove(1)
+        s.insert(0)
+        self.assertEqual([0, 3, 5, 8], [s.select(i) for i in range(4)])
+        self.assertEqual(1, s.rank(1))
+
+    def test_bulk(self):
+        rng = random.Random(3)
+        n = 200
+        items = [rng.randrange(n) for _ in range(150)]
+        bulk = OrderStatisticSet(n, items[:50])
+        bulk.update(items[50:])
+        single = OrderStatisticSet(n)
+        for x in items:
+            single.insert(x)
+        self.assertEqual(len(set(items)), len(bulk))
+        self.assertEqual(list(single), list(bulk))
+
+        for xs in ([5, -1, 300, 17], list(range(-5, n + 5))):
+            self.assertEqual([single.rank(x) for x in xs], bulk.rank_many(xs))
+
+
+if __name__ == '__main__':
+    unittest.main()
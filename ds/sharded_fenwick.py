@@ -0,0 +1,128 @@
+"""Sharded ingestion of updates into a fenwick tree.
+
+Batches of updates are aggregated in worker processes: point updates to the
+same index are summed, and range updates are split into suffix updates that
+are summed by their start. The master tree only applies the aggregates, one
+per distinct index, with its batched updates.
+"""
+
+import concurrent.futures
+import itertools
+import os
+
+
+def aggregate(n, updates, range_updates=True):
+    """Sum a batch of updates by index.
+
+    This is the work done by every worker process. A range update of val
+    on [left, right] is the same as adding val to [left, n-1] and -val to
+    [right+1, n-1], so with range updates the aggregates are suffix updates
+    keyed by their left end.
+
+    Complexity O(m*log(m)) for a batch of size m.
+
+    Args:
+      n: int, size of the tree.
+      updates: list of (left, right, val) tuples, val is added to each
+        element in [left, right]. Without range updates left == right.
+      range_updates: bool, whether range updates are supported.
+
+    Raises:
+      ValueError, for a range update without range_updates.
+
+    Return:
+      (indices, values), lists of the indexes in increasing order and of
+      the summed values at them, zero sums dropped.
+    """
+    deltas = {}
+    for left, right, val in updates:
+        if not range_updates and left != right:
+            raise ValueError('Range update on a tree without range_updates')
+        deltas[left] = deltas.get(left, 0) + val
+        if range_updates and right + 1 < n:
+            deltas[right + 1] = deltas.get(right + 1, 0) - val
+    indices = sorted(idx for idx, val in deltas.items() if val)
+    return indices, [deltas[idx] for idx in indices]
+
+
+def _apply(tree, indices, values):
+    """Apply aggregates to the master tree.
+
+    Args:
+      tree: algorithms.ds.fenwick.Fenwick, the master tree.
+      indices: list of int, from aggregate().
+      values: list of numbers, from aggregate().
+
+    Return:
+      void
+    """
+    if tree.range_updates:
+        tree.add_to_ranges(indices, [len(tree) - 1] * len(indices), values)
+    else:
+        tree.add_many(indices, values)
+
+
+def ingest(tree, updates, executor=None, batch_size=1 << 16,
+           max_pending=None):
+    """Apply a stream of updates to a tree using worker processes.
+
+    The stream is cut into batches. Every batch is aggregated by aggregate()
+    on the executor. The master collects the aggregates of done batches and
+    applies them together once there are n of them, or at the end. A linear
+    pass over the tree is then paid for by at least n aggregates, so the
+    master does O(1) amortized work per aggregate, and O(n*log(n)) for the
+    remainder. At most max_pending batches are in flight and at most n
+    aggregates are held, so memory stays bounded however long the stream
+    is.
+
+    Args:
+      tree: algorithms.ds.fenwick.Fenwick, the master tree.
+      updates: iterable of (left, right, val) tuples.
+      executor: concurrent.futures.Executor, a ProcessPoolExecutor is
+        created for the call if None.
+      batch_size: int, number of updates per batch. Larger batches sum
+        more updates to the same index and cost less to send back.
+      max_pending: int, batches in flight, twice the CPU count if None.
+
+    Return:
+      int, the number of updates applied.
+    """
+    if max_pending is None:
+        max_pending = 2 * (os.cpu_count() or 1)
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ProcessPoolExecutor()
+    count = 0
+    pending = set()
+    indices = []
+    values = []
+
+    def collect(futures):
+        for future in futures:
+            batch_indices, batch_values = future.result()
+            indices.extend(batch_indices)
+            values.extend(batch_values)
+        if len(indices) >= len(tree):
+            _apply(tree, indices, values)
+            del indices[:], values[:]
+
+    updates = iter(updates)
+    try:
+        while True:
+            batch = list(itertools.islice(updates, batch_size))
+            if not batch:
+                break
+            count += len(batch)
+            if len(pending) >= max_pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(
+                aggregate, len(tree), batch, tree.range_updates))
+        collect(concurrent.futures.as_completed(pending))
+        if indices:
+            _apply(tree, indices, values)
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return count
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+import concurrent.futures
+import random
+import unittest
+
+from fenwick import Fenwick
+from sharded_fenwick import aggregate, ingest
+
+
+class ShardedFenwickTest(unittest.TestCase):
+
+    def random_updates(self, rng, n, count, ranges=True):
+        updates = []
+        for _ in range(count):
+            left = rng.randrange(n)
+            right = rng.randrange(left, n) if ranges else left
+            updates.append((left, right, rng.randint(-9, 9)))
+        return updates
+
+    def test_merge(self):
+        a = Fenwick([1, 2, 3, 4])
+        b = Fenwick([0, 0, 0, 0])
+        b.add_to_range(1, 2, 5)
+        a.merge(b)
+        self.assertEqual([1, 8, 16, 20], [a.sum(i) for i in range(4)])
+        with self.assertRaises(ValueError):
+            a.merge(Fenwick([0, 0, 0]))
+        with self.assertRaises(ValueError):
+            a.merge(Fenwick([0, 0, 0, 0], range_updates=False))
+
+    def test_aggregate(self):
+        with self.assertRaises(ValueError):
+            aggregate(5, [(1, 3, 1)], range_updates=False)
+        self.assertEqual(([1, 3], [2, 1]), aggregate(
+            5, [(3, 3, 1), (1, 1, 5), (1, 1, -3), (2, 2, 4), (2, 2, -4)],
+            range_updates=False))
+        # Suffix updates: +2 from 1, -2 from 3, +1 from 2, nothing past 4.
+        self.assertEqual(([1, 2, 3], [2, 1, -2]), aggregate(
+            5, [(1, 2, 2), (2, 4, 1)]))
+
+    def test_ingest(self):
+        rng = random.Random(17)
+        n = 64
+        l = [rng.randint(-9, 9) for _ in range(n)]
+        for range_updates in (False, True):
+            updates = self.random_updates(rng, n, 500, ranges=range_updates)
+            expected = Fenwick(l, range_updates=range_updates)
+            for left, right, val in updates:
+                if range_updates:
+                    expected.add_to_range(left, right, val)
+                else:
+                    expected.add(left, val)
+            tree = Fenwick(l, range_updates=range_updates)
+            with concurrent.futures.ProcessPoolExecutor(2) as executor:
+                count = ingest(tree, iter(updates), executor, batch_size=64,
+                               max_pending=2)
+            self.assertEqual(500, count)
+            self.assertEqual([expected.sum(i) for i in range(n)],
+                             [tree.sum(i) for i in range(n)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+"""Fenwick trees over huge index spaces.
+
+Both trees have the add/add_to_range/sum semantics of
+algorithms.ds.fenwick.Fenwick, with all elements initially 0.
+
+SparseFenwick keeps only the nodes that were touched in a dict, so memory
+scales with the number of updates, not with the size of the index space.
+
+CompressedFenwick is built from the sorted set of keys that updates will
+use. The tree is dense over the positions of those keys and the keys
+themselves are only needed to multiply out range updates.
+"""
+
+import bisect
+
+
+class SparseFenwick(object):
+
+    def __init__(self, size, range_updates=True):
+        """Initialize an all zeros tree over [0, size).
+
+        Args:
+          size: int, size of the index space, e.g. 2**64.
+          range_updates: bool, whether range updates are supported.
+
+        Return:
+          void
+        """
+        self._size = size
+        self._range_updates = range_updates
+        self._add = {}
+        if range_updates:
+            self._mul = {}
+        else:
+            # Alias self._mul to save on memory.
+            self._mul = self._add
+
+    def __len__(self):
+        """Number of nodes stored.
+        """
+        return len(self._add)
+
+    def add(self, idx, val):
+        """Add val to element and index idx.
+
+        Complexity O(log(size)).
+
+        Args:
+          idx: int, index where val should be added.
+          val: number, value to add at location idx.
+
+        Return:
+          void
+        """
+        self.add_to_range(idx, idx, val)
+
+    def add_to_range(self, left, right, val):
+        """Add val to each of the elements in the range.
+
+        Complexity O(log(size)).
+
+        Args:
+          left: int, index of left element of range, inclusive.
+          right: int, index of right element of range, inclusive.
+          val: number, value to add.
+
+        Return:
+          void
+        """
+        self._update(left, val, -(left - 1) * val)
+        self._update(right, -val, right * val)
+
+    def _update(self, idx, mul, add):
+        """Update of the internal structures of the fenwick tree.
+
+        Args:
+          idx: int, index of the update.
+          mul: multiplicative value to add.
+          add: additive value to add.
+
+        Return:
+          void
+        """
+        tree_mul = self._mul
+        tree_add = self._add
+        while idx < self._size:
+            tree_mul[idx] = tree_mul.get(idx, 0) + mul
+            tree_add[idx] = tree_add.get(idx, 0) + add
+            idx |= (idx + 1)
+
+    def sum(self, idx):
+        """Compute the prefix sum up to an index.
+
+        Complexity O(log(size)).
+
+        Args:
+          idx: int, index of last element of the prefix sum.
+
+        Return:
+          number, the prefix sum.
+        """
+        x = idx
+        mul = 0
+        add = 0
+        tree_mul = self._mul
+        tree_add = self._add
+        while idx >= 0:
+            if idx in tree_add:
+                mul += tree_mul[idx]
+                add += tree_add[idx]
+            idx = (idx & (idx + 1)) - 1
+
+        ret = add
+        if self._range_updates:
+            ret += mul * x
+        return ret
+
+
+class CompressedFenwick(object):
+
+    def __init__(self, keys, range_updates=True):
+        """Initialize an all zeros tree over the declared keys.
+
+        Updates must use declared keys: add() takes a declared index, and
+        add_to_range() declared ends. Queries can use any index.
+
+        Complexity O(m*log(m)) for m keys, O(m) if they are sorted.
+
+        Args:
+          keys: iterable of int, the indexes updates will use.
+          range_updates: bool, whether range updates are supported.
+
+        Return:
+          void
+        """
+        self._keys = sorted(set(keys))
+        self._range_updates = range_updates
+        self._add = [0] * len(self._keys)
+        if range_updates:
+            self._mul = [0] * len(self._keys)
+        else:
+            # Alias self._mul to save on memory.
+            self._mul = self._add
+
+    def __len__(self):
+        """Number of declared keys.
+        """
+        return len(self._keys)
+
+    def _position(self, key):
+        """Find the position of a declared key.
+
+        Args:
+          key: int, a declared key.
+
+        Raises:
+          KeyError, if key was not declared.
+
+        Return:
+          int, position of key in the sorted keys.
+        """
+        pos = bisect.bisect_left(self._keys, key)
+        if pos == len(self._keys) or self._keys[pos] != key:
+            raise KeyError(key)
+        return pos
+
+    def add(self, idx, val):
+        """Add val to element and index idx.
+
+        Complexity O(log(m)).
+
+        Args:
+          idx: int, a declared key.
+          val: number, value to add at location idx.
+
+        Return:
+          void
+        """
+        self.add_to_range(idx, idx, val)
+
+    def add_to_range(self, left, right, val):
+        """Add val to each of the elements in the range.
+
+        Complexity O(log(m)).
+
+        Args:
+          left: int, a declared key, left end of range, inclusive.
+          right: int, a declared key, right end of range, inclusive.
+          val: number, value to add.
+
+        Return:
+          void
+        """
+        self._update(self._position(left), val, -(left - 1) * val)
+        self._update(self._position(right), -val, right * val)
+
+    def _update(self, pos, mul, add):
+        """Update of the internal structures of the fenwick tree.
+
+        Args:
+          pos: int, position of the key of the update.
+          mul: multiplicative value to add.
+          add: additive value to add.
+
+        Return:
+          void
+        """
+        m = len(self._add)
+        while pos < m:
+            self._mul[pos] += mul
+            self._add[pos] += add
+            pos |= (pos + 1)
+
+    def sum(self, idx):
+        """Compute the prefix sum up to an index.
+
+        Complexity O(log(m)).
+
+        Args:
+          idx: int, index of last element of the prefix sum, any integer.
+
+        Return:
+          number, the prefix sum.
+        """
+        # The updates that affect the prefix sum are at keys <= idx.
+        pos = bisect.bisect_right(self._keys, idx) - 1
+        mul = 0
+        add = 0
+        while pos >= 0:
+            mul += self._mul[pos]
+            add += self._add[pos]
+            pos = (pos & (pos + 1)) - 1
+
+        ret = add
+        if self._range_updates:
+            ret += mul * idx
+        return ret
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+import random
+import unittest
+
+from fenwick import Fenwick
+from sparse_fenwick import CompressedFenwick, SparseFenwick
+
+
+class SparseFenwickTest(unittest.TestCase):
+
+    def random_updates(self, rng, n, count):
+        updates = []
+        for _ in range(count):
+            left = rng.randrange(n)
+            right = rng.randrange(left, n)
+            updates.append((left, right, rng.randint(-9, 9)))
+        return updates
+
+    def test_matches_dense(self):
+        """Both sparse trees agree with a dense tree on a small range.
+        """
+        rng = random.Random(5)
+        n = 40
+        updates = self.random_updates(rng, n, 30)
+        keys = [left for left, _, _ in updates] + [r for _, r, _ in updates]
+        for range_updates in (False, True):
+            dense = Fenwick([0] * n, range_updates=range_updates)
+            sparse = SparseFenwick(n, range_updates=range_updates)
+            compressed = CompressedFenwick(keys, range_updates=range_updates)
+            for left, right, val in updates:
+                if range_updates:
+                    dense.add_to_range(left, right, val)
+                    sparse.add_to_range(left, right, val)
+                    compressed.add_to_range(left, right, val)
+                else:
+                    dense.add(left, val)
+                    sparse.add(left, val)
+                    compressed.add(left, val)
+            for idx in range(n):
+                self.assertEqual(dense.sum(idx), sparse.sum(idx))
+                self.assertEqual(dense.sum(idx), compressed.sum(idx))
+
+    def test_huge_index_space(self):
+        size = 2**64
+        sparse = SparseFenwick(size)
+        compressed = CompressedFenwick([5, 2**40, 2**63, size - 1])
+        for tree in (sparse, compressed):
+            tree.add(5, 3)
+            tree.add_to_range(2**40, 2**63, 2)
+            tree.add(size - 1, 1)
+            self.assertEqual(0, tree.sum(4))
+            self.assertEqual(3, tree.sum(2**40 - 1))
+            self.assertEqual(5, tree.sum(2**40))
+            self.assertEqual(3 + 2 * 1000, tree.sum(2**40 + 999))
+            self.assertEqual(3 + 2 * (2**63 - 2**40 + 1), tree.sum(size - 2))
+            self.assertEqual(4 + 2 * (2**63 - 2**40 + 1), tree.sum(size - 1))
+        # Each update touches at most 64 nodes.
+        self.assertLessEqual(len(sparse), 4 * 64)
+        self.assertEqual(4, len(compressed))
+
+    def test_undeclared_key(self):
+        compressed = CompressedFenwick([1, 3])
+        with self.assertRaises(KeyError):
+            compressed.add(2, 1)
+        with self.assertRaises(KeyError):
+            compressed.add_to_range(1, 4, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
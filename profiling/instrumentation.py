@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+"""Opt-in instrumentation of searches, tree walks and encoders.
+
+Nothing is recorded unless a registry is active:
+
+  with instrumentation.collect() as registry:
+      combinatorist.decode_combination(enc)
+  print(registry.to_json())
+
+Instrumented code checks the module global registry once per call and does
+nothing else while it is None, so the cost of disabled instrumentation is a
+single lookup.
+
+Everything is recorded per event and per call site, the file and line of
+the closest caller outside the instrumented module. Not thread-safe.
+"""
+
+import collections
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+# The active Registry, None when instrumentation is disabled.
+registry = None
+
+
+class Histogram(object):
+
+    def __init__(self):
+        """Initialize an empty latency histogram.
+        """
+        self.count = 0
+        self.total = 0.0
+        # Bucket b counts latencies in [2^(b-1), 2^b) nanoseconds.
+        self.buckets = collections.Counter()
+
+    def observe(self, seconds):
+        """Record one latency.
+
+        Args:
+          seconds: float, the latency.
+        """
+        self.count += 1
+        self.total += seconds
+        self.buckets[int(seconds * 1e9).bit_length()] += 1
+
+    def to_dict(self):
+        """Convert to plain data.
+
+        Returns:
+          dict, with the count, the total and the buckets keyed by their
+          upper bound in nanoseconds.
+        """
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'buckets': {'<%dns' % 2**b: self.buckets[b]
+                        for b in sorted(self.buckets)},
+        }
+
+
+class Registry(object):
+
+    def __init__(self):
+        """Initialize an empty registry.
+        """
+        # event -> call site -> count.
+        self.counters = collections.defaultdict(collections.Counter)
+        # event -> call site -> Histogram.
+        self.histograms = collections.defaultdict(
+            lambda: collections.defaultdict(Histogram))
+
+    def count(self, event, n=1, site=''):
+        """Add n to the counter of an event.
+
+        Args:
+          event: str, name of the event.
+          n: int, amount to add.
+          site: str, call site of the event.
+        """
+        self.counters[event][site] += n
+
+    def observe(self, event, seconds, site=''):
+        """Record the latency of an event.
+
+        Args:
+          event: str, name of the event.
+          seconds: float, the latency.
+          site: str, call site of the event.
+        """
+        self.histograms[event][site].observe(seconds)
+
+    def counting(self, func, event, site=''):
+        """Wrap a function to count its calls as an event.
+
+        Args:
+          func: function, e.g. a search predicate.
+          event: str, name of the event.
+          site: str, call site of the event.
+
+        Returns:
+          function, same results as func.
+        """
+        counter = self.counters[event]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            counter[site] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def to_dict(self):
+        """Convert to plain data.
+
+        Returns:
+          dict, counters and histograms by event and call site.
+        """
+        return {
+            'counters': {event: dict(sites)
+                         for event, sites in self.counters.items()},
+            'histograms': {event: {site: histogram.to_dict()
+                                   for site, histogram in sites.items()}
+                           for event, sites in self.histograms.items()},
+        }
+
+    def to_json(self, indent=None):
+        """Export as JSON.
+
+        Args:
+          indent: int, indentation as in json.dumps.
+
+        Returns:
+          str, JSON document.
+        """
+        return json.dumps(self.to_dict(), indent=indent, sort_keys=True)
+
+    def dump(self, path):
+        """Export as JSON to a file.
+
+        Args:
+          path: str, file to write.
+        """
+        with open(path, 'w') as f:
+            f.write(self.to_json(indent=2))
+
+
+@contextlib.contextmanager
+def collect(new_registry=None):
+    """Activate a registry for the duration of a with block.
+
+    Args:
+      new_registry: Registry, a new one if None.
+
+    Returns:
+      context manager, yields the active registry.
+    """
+    global registry
+    previous = registry
+    registry = new_registry if new_registry is not None else Registry()
+    try:
+        yield registry
+    finally:
+        registry = previous
+
+
+def call_site():
+    """Find the closest caller outside the module calling call_site().
+
+    Returns:
+      str, 'file:line' of the caller.
+    """
+    frame = sys._getframe(1)
+    filename = frame.f_code.co_filename
+    while frame is not None and frame.f_code.co_filename == filename:
+        frame = frame.f_back
+    if frame is None:
+        return '?'
+    return '%s:%d' % (os.path.basename(frame.f_code.co_filename),
+                      frame.f_lineno)
+
+
+def instrumented(event):
+    """Decorate a function to time every call while a registry is active.
+
+    Args:
+      event: str, name of the event.
+
+    Returns:
+      function, the decorator.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = registry
+            if active is None:
+                return func(*args, **kwargs)
+            site = call_site()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                active.observe(event, time.perf_counter() - start, site)
+        return wrapper
+    return decorator
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from algorithms.ds.fenwick import Fenwick
+# The instrumented modules share the state of this exact module object.
+from algorithms.profiling import instrumentation
+from algorithms.search.binary_search import binary_search, gallop_search
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_disabled(self):
+        self.assertIsNone(instrumentation.registry)
+        registry = instrumentation.Registry()
+        binary_search(0, 100, lambda mid: 42 <= mid)
+        self.assertEqual({'counters': {}, 'histograms': {}},
+                         registry.to_dict())
+
+    def test_collect(self):
+        with instrumentation.collect() as registry:
+            self.assertIs(registry, instrumentation.registry)
+            with instrumentation.collect() as inner:
+                binary_search(0, 8, lambda mid: 3 <= mid)
+            binary_search(0, 100, lambda mid: 42 <= mid)
+            tree = Fenwick([0] * 16, range_updates=False)
+            tree.sum(6)
+            tree.add(0, 1)
+        self.assertIsNone(instrumentation.registry)
+
+        self.assertEqual(3, sum(inner.counters['binary_search.probes'].values()))
+        probes = registry.counters['binary_search.probes']
+        self.assertEqual(1, len(probes))
+        site, count = list(probes.items())[0]
+        self.assertTrue(site.startswith('instrumentation_test.py:'))
+        self.assertEqual(7, count)
+        # 6 + 1 = 0b111 and both halves of add() walk 0, 1, 3, 7, 15.
+        self.assertEqual(
+            [3], list(registry.counters['fenwick.sum.nodes'].values()))
+        self.assertEqual(
+            [10], list(registry.counters['fenwick.update.nodes'].values()))
+
+    def test_gallop_probes(self):
+        with instrumentation.collect() as registry:
+            # Gallops over 0, 2, 6, 14, then binary searches [7, 14).
+            self.assertEqual(10, gallop_search(0, lambda mid: 10 <= mid))
+        probes = registry.counters['binary_search.probes']
+        self.assertEqual(1, len(probes))
+        self.assertEqual(4 + 3, sum(probes.values()))
+
+    def test_instrumented(self):
+        @instrumentation.instrumented('test.square')
+        def square(x):
+            return x * x
+
+        self.assertEqual(4, square(2))
+        with instrumentation.collect() as registry:
+            for x in range(3):
+                square(x)
+            self.assertEqual(16, square(4))
+        histograms = registry.to_dict()['histograms']['test.square']
+        # Two call sites.
+        self.assertEqual([1, 3], sorted(h['count']
+                                        for h in histograms.values()))
+        for histogram in histograms.values():
+            self.assertEqual(histogram['count'],
+                             sum(histogram['buckets'].values()))
+
+    def test_dump(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'stats.json')
+        registry = instrumentation.Registry()
+        registry.count('event', 2, 'site')
+        registry.observe('event', 1e-6, 'site')
+        registry.dump(path)
+        with open(path) as f:
+            stats = json.load(f)
+        self.assertEqual({'event': {'site': 2}}, stats['counters'])
+        self.assertEqual({'<1024ns': 1},
+                         stats['histograms']['event']['site']['buckets'])
+
+
+if __name__ == '__main__':
+    unittest.main()
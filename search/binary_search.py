@@ -3,8 +3,25 @@
 """General binary search.
 """
 
+import types
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from algorithms.profiling import instrumentation
+except ImportError:
+    # Imported on its own, outside of the algorithms package. A registry
+    # is never active then.
+    instrumentation = types.SimpleNamespace(registry=None)
+
+
 def binary_search(lo, hi, go_left):
-    """Binry search a range by predicate.
+    """Binary search a range by predicate.
+
+    Iterative, so no stack frame per halving.
 
     lo <= hi
     Args:
@@ -14,10 +31,154 @@ def binary_search(lo, hi, go_left):
     Returns:
       int, index where binary search ends, [lo, hi].
     """
+    if instrumentation.registry is not None:
+        go_left = instrumentation.registry.counting(
+            go_left, 'binary_search.probes', instrumentation.call_site())
+    while lo < hi:
+        mid = lo + (hi-lo)//2
+        if go_left(mid):
+            hi = mid
+        else:
+            lo = mid+1
+    return lo
+
+
+def gallop_search(lo, go_left, hi=None):
+    """Exponential search from lo by predicate.
+
+    Probes lo, lo+2, lo+6, lo+14, ... until go_left holds, then binary
+    searches the last gap. Finding an answer d positions away from lo takes
+    O(log(d)) probes, so it is cheaper than binary_search when the answer is
+    usually close to lo, and works when there is no upper bound.
+
+    Args:
+      lo: int, lower bound of range, inclusive.
+      go_left: function, a predicate that says which way to search.
+      hi: int, higher bound of range, exclusive. None for unbounded, then
+        go_left must hold somewhere.
+    Returns:
+      int, index where the search ends, [lo, hi].
+    """
+    # The final binary_search() counts its own probes.
+    gallop_left = go_left
+    if instrumentation.registry is not None:
+        gallop_left = instrumentation.registry.counting(
+            go_left, 'binary_search.probes', instrumentation.call_site())
+    step = 1
+    while True:
+        probe = lo + step - 1
+        if hi is not None and probe >= hi:
+            return binary_search(lo, hi, go_left)
+        if gallop_left(probe):
+            return binary_search(lo, probe, go_left)
+        lo = probe+1
+        step *= 2
+
+
+def binary_search_many(los, his, go_left):
+    """Run many binary searches together, one halving per round.
+
+    Every round calls go_left once with the midpoints of all searches still
+    running, so N searches over ranges of size n take O(log(n)) predicate
+    calls instead of O(N*log(n)). The predicate can then compare all
+    midpoints at once, e.g. with a single numpy operation.
+
+    If los is a numpy array the bookkeeping is vectorized as well, and
+    go_left gets numpy arrays.
+
+    Args:
+      los: sequence of int, lower bounds of the ranges, inclusive.
+      his: sequence of int, higher bounds of the ranges, exclusive.
+      go_left: function, takes the indexes of the running searches and
+        their midpoints, returns a sequence of bool, one per search.
+    Returns:
+      list of int (numpy array if los is one), where every search ends.
+    """
+    if instrumentation.registry is not None:
+        go_left = instrumentation.registry.counting(
+            go_left, 'binary_search_many.rounds', instrumentation.call_site())
+    if numpy is not None and isinstance(los, numpy.ndarray):
+        lo = numpy.array(los, dtype=numpy.int64)
+        hi = numpy.array(his, dtype=numpy.int64)
+        active = numpy.flatnonzero(lo < hi)
+        while len(active):
+            mids = lo[active] + (hi[active]-lo[active])//2
+            left = numpy.asarray(go_left(active, mids), dtype=bool)
+            hi[active[left]] = mids[left]
+            lo[active[~left]] = mids[~left]+1
+            active = active[lo[active] < hi[active]]
+        return lo
+
+    lo = list(los)
+    hi = list(his)
+    active = [i for i in range(len(lo)) if lo[i] < hi[i]]
+    while active:
+        mids = [lo[i] + (hi[i]-lo[i])//2 for i in active]
+        running = []
+        for i, mid, left in zip(active, mids, go_left(active, mids)):
+            if left:
+                hi[i] = mid
+            else:
+                lo[i] = mid+1
+            if lo[i] < hi[i]:
+                running.append(i)
+        active = running
+    return lo
+
+
+def interpolation_search(lo, hi, key, target, strict=False):
+    """Search a range of non-decreasing numeric keys by interpolation.
+
+    Probes where target would be if the keys were evenly spread between the
+    keys at the ends of the range. Whenever a probe fails to halve the range
+    a bisection step follows, so the worst case stays O(log(n)) probes, while
+    evenly spread keys take O(loglog(n)) expected probes.
+
+    Same result as binary_search(lo, hi, lambda m: target <= key(m)), or
+    target < key(m) if strict.
+
+    lo <= hi
+    Args:
+      lo: int, lower bound of range, inclusive.
+      hi: int, higher bound of range, exclusive.
+      key: function, the key at an index, non-decreasing over the range.
+      target: number, the key to look for.
+      strict: bool, find the first key > target instead of >= target.
+    Returns:
+      int, index where the search ends, [lo, hi].
+    """
+    if instrumentation.registry is not None:
+        key = instrumentation.registry.counting(
+            key, 'interpolation_search.probes', instrumentation.call_site())
+
+    def before(k):
+        return k <= target if strict else k < target
+
     if lo >= hi:
         return lo
-    mid = lo + (hi-lo)//2
-    if go_left(mid):
-        return binary_search(lo, mid, go_left)
-    else:
-        return binary_search(mid+1, hi, go_left)
+    key_lo = key(lo)
+    if not before(key_lo):
+        return lo
+    key_hi = key(hi-1)
+    if before(key_hi):
+        return hi
+    # From here on before(key(lo)) and not before(key(hi)), so the keys
+    # differ and the answer is in (lo, hi].
+    hi -= 1
+    while hi - lo > 1:
+        size = hi - lo
+        offset = (target - key_lo) * (hi - lo) // (key_hi - key_lo)
+        mid = min(max(lo + int(offset), lo+1), hi-1)
+        k = key(mid)
+        if before(k):
+            lo, key_lo = mid, k
+        else:
+            hi, key_hi = mid, k
+        if hi - lo > size//2 and hi - lo > 1:
+            mid = lo + (hi-lo)//2
+            k = key(mid)
+            if before(k):
+                lo, key_lo = mid, k
+            else:
+                hi, key_hi = mid, k
+    return hi
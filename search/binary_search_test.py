@@ -2,7 +2,13 @@
 
 import unittest
 
-from binary_search import binary_search
+from binary_search import (binary_search, binary_search_many, gallop_search,
+                           interpolation_search)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class BinarySearchTest(unittest.TestCase):
 
@@ -174,5 +180,113 @@ class BinarySearchTest(unittest.TestCase):
         self.assertEqual(len(arr), binary_search(0, len(arr), pred))
 
 
+    def test_gallop_matches_binary_search(self):
+        arr = [-7, -3, 0, 2, 2, 2, 8, 10, 13]
+        for searchee in range(-9, 15):
+            go_left_lb = self.get_go_left_lower_bound(arr, searchee)
+            go_left_ub = self.get_go_left_upper_bound(arr, searchee)
+            for lo in range(len(arr) + 1):
+                self.assertEqual(binary_search(lo, len(arr), go_left_lb),
+                                 gallop_search(lo, go_left_lb, len(arr)))
+                self.assertEqual(binary_search(lo, len(arr), go_left_ub),
+                                 gallop_search(lo, go_left_ub, len(arr)))
+
+
+    def test_gallop_unbounded(self):
+        probes = []
+        def smaller_or_equal(guess):
+            probes.append(guess)
+            return 10**12 <= guess
+        self.assertEqual(10**12, gallop_search(0, smaller_or_equal))
+        self.assertLess(len(probes), 2 * 41)
+        self.assertEqual(3, gallop_search(3, lambda guess: 3 <= guess))
+        self.assertEqual(0, gallop_search(-5, lambda guess: 0 <= guess))
+
+
+    def test_deep_range(self):
+        # No recursion limit for huge ranges.
+        self.assertEqual(2**4000 + 1,
+                         binary_search(0, 2**5000,
+                                       lambda guess: 2**4000 < guess))
+
+
+    def test_binary_search_many(self):
+        arr = [-7, -3, 0, 2, 2, 2, 8, 10, 13]
+        searchees = list(range(-9, 15))
+        los = [i % 3 for i in range(len(searchees))]
+        his = [len(arr)] * len(searchees)
+        calls = []
+        def go_left(queries, mids):
+            calls.append(len(queries))
+            return [searchees[q] <= arr[mid] for q, mid in zip(queries, mids)]
+        expected = [
+            binary_search(lo, len(arr),
+                          self.get_go_left_lower_bound(arr, searchee))
+            for lo, searchee in zip(los, searchees)]
+        self.assertEqual(expected, binary_search_many(los, his, go_left))
+        # One call per halving, not per search.
+        self.assertLessEqual(len(calls), 4)
+        self.assertEqual([], binary_search_many([], [], go_left))
+        self.assertEqual([3, 5], binary_search_many([3, 5], [3, 5], go_left))
+
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_binary_search_many_numpy(self):
+        arr = numpy.array([-7, -3, 0, 2, 2, 2, 8, 10, 13])
+        searchees = numpy.arange(-9, 15)
+        los = numpy.zeros(len(searchees), dtype=numpy.int64)
+        his = numpy.full(len(searchees), len(arr))
+        def go_left(queries, mids):
+            return searchees[queries] < arr[mids]
+        expected = [
+            binary_search(0, len(arr),
+                          self.get_go_left_upper_bound(arr, searchee))
+            for searchee in searchees]
+        self.assertEqual(expected,
+                         binary_search_many(los, his, go_left).tolist())
+
+
+    def test_interpolation_matches_binary_search(self):
+        for arr in ([-7, -3, 0, 2, 2, 2, 8, 10, 13],
+                    [0.5, 0.5, 0.5, 1.25, 7.0],
+                    [4], []):
+            for searchee in [x / 4 for x in range(-40, 60)]:
+                lb = binary_search(0, len(arr),
+                                   self.get_go_left_lower_bound(arr, searchee))
+                ub = binary_search(0, len(arr),
+                                   self.get_go_left_upper_bound(arr, searchee))
+                self.assertEqual(lb, interpolation_search(
+                    0, len(arr), arr.__getitem__, searchee))
+                self.assertEqual(ub, interpolation_search(
+                    0, len(arr), arr.__getitem__, searchee, strict=True))
+
+
+    def test_interpolation_probes(self):
+        probes = []
+        def key(i):
+            probes.append(i)
+            return 3 * i + i % 2
+        n = 10**6
+        for target in range(0, 3 * n, 99991):
+            expected = binary_search(0, n, lambda m: target <= key(m))
+            probes = []
+            self.assertEqual(expected,
+                             interpolation_search(0, n, key, target))
+            # Evenly spread keys need only a handful of probes.
+            self.assertLessEqual(len(probes), 8)
+
+        # Badly skewed keys fall back to bisection.
+        def skewed_key(i):
+            probes.append(i)
+            return 2**i
+        n = 2**12
+        for target in (2, 2**100, 2**2000, 2**4000 + 1):
+            expected = binary_search(0, n, lambda m: target <= 2**m)
+            probes = []
+            self.assertEqual(expected,
+                             interpolation_search(0, n, skewed_key, target))
+            self.assertLessEqual(len(probes), 2 * 12 + 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+"""Static search index over sorted keys in Eytzinger (BFS) order.
+
+The keys are laid out like an implicit binary heap: node k has children 2k
+and 2k+1. The first levels of the search, the ones every lookup touches,
+share a few cache lines, and the next probe is computed without branches.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class EytzingerIndex(object):
+
+    def __init__(self, keys):
+        """Build the index.
+
+        Complexity O(n).
+
+        Args:
+          keys: list/tuple, sorted keys.
+        """
+        n = len(keys)
+        self._n = n
+        # Index 0 is unused by the layout, its rank stands for "not found".
+        self._tree = [None] * (n + 1)
+        self._rank = [n] * (n + 1)
+        # In-order traversal of the implicit tree visits the keys in order.
+        stack = []
+        k = 1
+        i = 0
+        while stack or k <= n:
+            if k <= n:
+                stack.append(k)
+                k *= 2
+            else:
+                k = stack.pop()
+                self._tree[k] = keys[i]
+                self._rank[k] = i
+                i += 1
+                k = 2 * k + 1
+
+        self._numpy_tree = None
+        if numpy is not None and n:
+            tree = numpy.asarray([keys[0]] + self._tree[1:])
+            if tree.dtype.kind in 'iuf':
+                self._numpy_tree = tree
+                self._numpy_rank = numpy.asarray(self._rank)
+
+    def __len__(self):
+        return self._n
+
+    def _search(self, x, strict):
+        """Walk down the tree and map the final node to its sorted index.
+
+        Args:
+          x: key to look up.
+          strict: bool, find the first key > x instead of >= x.
+        Returns:
+          int, index into the sorted keys, [0, n].
+        """
+        tree = self._tree
+        n = self._n
+        k = 1
+        if strict:
+            while k <= n:
+                k = 2 * k + (tree[k] <= x)
+        else:
+            while k <= n:
+                k = 2 * k + (tree[k] < x)
+        # Undo the right turns after the last left turn, and that left turn.
+        k //= 2 * (~k & (k + 1))
+        return self._rank[k]
+
+    def lower_bound(self, x):
+        """Find the first key >= x.
+
+        Same result as binary_search(0, n, lambda m: x <= keys[m]).
+
+        Complexity O(log(n)).
+
+        Args:
+          x: key to look up.
+        Returns:
+          int, index into the sorted keys, [0, n].
+        """
+        return self._search(x, False)
+
+    def upper_bound(self, x):
+        """Find the first key > x.
+
+        Same result as binary_search(0, n, lambda m: x < keys[m]).
+
+        Complexity O(log(n)).
+
+        Args:
+          x: key to look up.
+        Returns:
+          int, index into the sorted keys, [0, n].
+        """
+        return self._search(x, True)
+
+    def _search_many(self, xs, strict):
+        """Look up many keys at once.
+
+        With numpy and numeric keys all lookups descend one level per step,
+        and queries that reached the bottom are masked instead of branched
+        on.
+
+        Args:
+          xs: sequence of keys to look up.
+          strict: bool, find the first key > x instead of >= x.
+        Returns:
+          list of int, or a numpy array with numpy and numeric keys.
+        """
+        if self._numpy_tree is None:
+            return [self._search(x, strict) for x in xs]
+        xs = numpy.asarray(xs)
+        n = self._n
+        k = numpy.ones(len(xs), dtype=numpy.int64)
+        for _ in range(n.bit_length()):
+            node = self._numpy_tree[numpy.minimum(k, n)]
+            right = node <= xs if strict else node < xs
+            k = numpy.where(k <= n, 2 * k + right, k)
+        k //= 2 * (~k & (k + 1))
+        return self._numpy_rank[k]
+
+    def lower_bound_many(self, xs):
+        """Find the first key >= x for each of xs.
+
+        Args:
+          xs: sequence of keys to look up.
+        Returns:
+          list of int, or a numpy array with numpy and numeric keys.
+        """
+        return self._search_many(xs, False)
+
+    def upper_bound_many(self, xs):
+        """Find the first key > x for each of xs.
+
+        Args:
+          xs: sequence of keys to look up.
+        Returns:
+          list of int, or a numpy array with numpy and numeric keys.
+        """
+        return self._search_many(xs, True)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+import unittest
+
+from binary_search import binary_search
+from eytzinger import EytzingerIndex
+
+
+class EytzingerIndexTest(unittest.TestCase):
+
+    def check(self, arr):
+        index = EytzingerIndex(arr)
+        self.assertEqual(len(arr), len(index))
+        searchees = [x / 2 for x in range(-20, 30)]
+        lower = [binary_search(0, len(arr), lambda mid: x <= arr[mid])
+                 for x in searchees]
+        upper = [binary_search(0, len(arr), lambda mid: x < arr[mid])
+                 for x in searchees]
+        self.assertEqual(lower, [index.lower_bound(x) for x in searchees])
+        self.assertEqual(upper, [index.upper_bound(x) for x in searchees])
+        self.assertEqual(lower, list(index.lower_bound_many(searchees)))
+        self.assertEqual(upper, list(index.upper_bound_many(searchees)))
+
+
+    def test_sizes(self):
+        arr = [-7, -3, 0, 2, 2, 2, 8, 10, 13, 13, 13, 14]
+        for n in range(len(arr) + 1):
+            self.check(arr[:n])
+
+
+    def test_non_numeric_keys(self):
+        # Big integers and strings take the pure python path.
+        big = [2**70, 2**71, 2**72]
+        index = EytzingerIndex(big)
+        self.assertEqual([0, 1, 3], index.lower_bound_many([0, 2**71, 2**80]))
+        words = ['apple', 'kiwi', 'pear']
+        index = EytzingerIndex(words)
+        self.assertEqual(1, index.lower_bound('banana'))
+        self.assertEqual(2, index.upper_bound('kiwi'))
+
+
+if __name__ == '__main__':
+    unittest.main()